@@ -0,0 +1,458 @@
+# Copyright (c) 2026, Stéphane Brunner
+"""
+Benchmark the hooks on a synthetic Git repository.
+
+The repository is generated with a configurable number of files, history depth and renames, with
+big workflow, prospector and pyproject fixtures. The hooks are timed through their command line entry
+points (in a new interpreter, like pre-commit runs them), with their options and per kind of file, and
+the results are written in a JSON file that can be compared with the results of another commit.
+
+Only the command line of the hooks is used, so the script can run on the older commits, the benchmarks
+with a hook or an option not supported by the checked out commit are skipped.
+
+Usage:
+
+    python benchmarks/benchmark.py --output=results.json
+    git worktree add /tmp/other other-branch
+    python benchmarks/benchmark.py --sources=/tmp/other --output=other.json --compare=results.json
+"""
+
+import argparse
+import functools
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import statistics
+import subprocess  # nosec
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any, NamedTuple, Optional
+
+_ROOT = Path(__file__).parent.parent
+
+_FIRST_YEAR = 2018
+_LAST_YEAR = 2025
+
+
+class _Repository:
+    """Generate the synthetic Git repository."""
+
+    def __init__(self, path: Path, seed: int, env: dict[str, str]) -> None:
+        self.path = path
+        # The environment used to run the hooks
+        self.env = env
+        self.random = random.Random(seed)  # noqa: S311 # nosec
+        self.git_cmd = shutil.which("git") or "git"
+        # The file name of each file, with the year of its first and last commit
+        self.files: dict[str, tuple[int, int]] = {}
+
+    def git(self, *args: str, date: Optional[str] = None) -> None:
+        env = {
+            **os.environ,
+            "GIT_AUTHOR_NAME": "Benchmark",
+            "GIT_AUTHOR_EMAIL": "benchmark@example.com",
+            "GIT_COMMITTER_NAME": "Benchmark",
+            "GIT_COMMITTER_EMAIL": "benchmark@example.com",
+        }
+        if date is not None:
+            env["GIT_AUTHOR_DATE"] = date
+            env["GIT_COMMITTER_DATE"] = date
+        subprocess.run([self.git_cmd, *args], cwd=self.path, env=env, check=True, stdout=subprocess.DEVNULL)  # noqa: S603
+
+    def write_source(self, file_name: str, first_year: int, last_year: int) -> None:
+        """Write a source file, with the copyright of the year of its last commit."""
+        years = str(first_year) if first_year == last_year else f"{first_year}-{last_year}"
+        lines = [f"# Copyright (c) {years}, Benchmark", "", f'"""Module {file_name}."""', ""]
+        lines += [f"VALUE_{index} = {self.random.randint(0, 1000000)}" for index in range(50)]
+        file_path = self.path / file_name
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        self.files[file_name] = (first_year, last_year)
+
+    def commit(self, index: int, commits: int, message: str) -> int:
+        """Commit all the changes, the commits are spread between the first and the last year."""
+        year = _FIRST_YEAR + (_LAST_YEAR - _FIRST_YEAR) * index // max(1, commits - 1)
+        self.git("add", "--all")
+        self.git("commit", "--quiet", "--no-verify", f"--message={message}", date=f"{year}-06-01T12:00:00")
+        return year
+
+    def create(self, files: int, commits: int, renames: int) -> None:
+        """Create the repository with its history."""
+        self.path.mkdir(parents=True)
+        self.git("init", "--quiet")
+        for index in range(files):
+            self.write_source(f"src/package{index % 20}/module_{index}.py", _FIRST_YEAR, _FIRST_YEAR)
+        self.commit(0, commits, "Initial commit")
+
+        renamed = 0
+        for index in range(1, commits):
+            year = _FIRST_YEAR + (_LAST_YEAR - _FIRST_YEAR) * index // max(1, commits - 1)
+            for file_name in self.random.sample(sorted(self.files), max(1, len(self.files) // 10)):
+                self.write_source(file_name, self.files[file_name][0], year)
+            # Spread the renames in the history
+            for _ in range(renames * index // max(1, commits - 1) - renamed):
+                file_name = self.random.choice(sorted(self.files))
+                new_file_name = re.sub(r"\.py$", f"_renamed{renamed}.py", file_name)
+                self.git("mv", file_name, new_file_name)
+                first_year, _ = self.files.pop(file_name)
+                self.write_source(new_file_name, first_year, year)
+                renamed += 1
+            self.commit(index, commits, f"Commit {index}")
+
+    def create_fixtures(self, workflow_jobs: int, prospector_configs: int, pyproject_tables: int) -> None:
+        """Create the big fixtures, in a last commit."""
+        (self.path / "LICENSE").write_text(f"Copyright (c) {_FIRST_YEAR}-{_LAST_YEAR}, Benchmark\n")
+        # Already with the hook added by multi_repo_automation when a YAML file is modified,
+        # to not run pre-commit in the canonicalize benchmarks
+        (self.path / ".pre-commit-config.yaml").write_text(
+            "repos:\n"
+            "  - repo: https://github.com/pre-commit/mirrors-prettier\n"
+            "    rev: v2.7.1\n"
+            "    hooks:\n"
+            "      - id: prettier\n"
+            "        additional_dependencies:\n"
+            "          - prettier@2.8.4  # npm\n",
+            encoding="utf-8",
+        )
+
+        workflows_path = self.path / ".github" / "workflows"
+        workflows_path.mkdir(parents=True)
+        jobs = []
+        for index in range(workflow_jobs):
+            steps = "".join(
+                f"      - name: Step {step}\n        run: |\n"
+                + "".join(f"          echo 'job {index} step {step} line {line}'\n" for line in range(10))
+                for step in range(10)
+            )
+            jobs.append(
+                f"  job{index}:\n"
+                "    runs-on: ubuntu-24.04\n"
+                "    strategy:\n"
+                "      matrix:\n"
+                "        python: ['3.10', '3.11', '3.12', '3.13']\n"
+                f"    steps:\n{steps}"
+                "    timeout-minutes: 10\n"
+                f"    name: Job {index}\n",
+            )
+        (workflows_path / "main.yaml").write_text(
+            "on:\n  push:\n\nname: Benchmark\n\njobs:\n" + "".join(jobs),
+            encoding="utf-8",
+        )
+
+        for index in range(prospector_configs):
+            config_path = self.path / "prospector" / f"project{index}"
+            config_path.mkdir(parents=True)
+            (config_path / ".prospector.yaml").write_text(
+                "ruff:\n"
+                "  options:\n"
+                f"    line-length: {100 + index}\n"
+                "  disable:\n"
+                "    - E501\n"
+                "pylint:\n"
+                "  disable:\n"
+                "    - too-many-lines\n"
+                "inherits:\n"
+                "  - strictness_veryhigh\n"
+                "  - full_pep8\n",
+                encoding="utf-8",
+            )
+            (config_path / "pyproject.toml").write_text(
+                f'[project]\nname = "project{index}"\nversion = "1.0.0"\n',
+                encoding="utf-8",
+            )
+
+        tables = [
+            f'[tool.tool{index}]\nname = "tool{index}"\nvalues = [1, 2, 3]\n'
+            for index in self.random.sample(range(pyproject_tables), pyproject_tables)
+        ]
+        pyproject = "\n".join(
+            [
+                '[build-system]\nrequires = ["poetry-core"]\n',
+                *tables,
+                '[project]\nname = "benchmark"\nversion = "1.0.0"\n',
+            ],
+        )
+        for directory in ("pyproject", "pyproject-canonical"):
+            (self.path / directory).mkdir()
+            (self.path / directory / "pyproject.toml").write_text(pyproject, encoding="utf-8")
+        # Already canonical, to check the fast path
+        subprocess.run(
+            [sys.executable, "-m", "sbrunner_hooks.canonicalize", "pyproject-canonical/pyproject.toml"],
+            cwd=self.path,
+            env=self.env,
+            check=False,
+            stdout=subprocess.DEVNULL,
+        )
+
+        self.git("add", "--all")
+        self.git(
+            "commit", "--quiet", "--no-verify", "--message=Fixtures", date=f"{_LAST_YEAR}-12-01T12:00:00"
+        )
+
+    def reset(self) -> None:
+        """Restore the files modified by a benchmark."""
+        self.git("reset", "--quiet", "--hard")
+        self.git("clean", "--quiet", "-d", "--force")
+
+
+class _Benchmark(NamedTuple):
+    """A hook run, the setup restores the files modified by the hook and is not timed."""
+
+    module: str
+    args: list[str]
+    setup: Optional[Callable[[], None]] = None
+    # The sub command of the hook, where the options are defined
+    command: tuple[str, ...] = ()
+
+
+def _time(function: Callable[[], object], repeat: int, setup: Optional[Callable[[], None]]) -> dict[str, Any]:
+    """Time the function, the setup is run before each run and is not timed."""
+    runs = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        runs.append(time.perf_counter() - start)
+    return {"runs": runs, "min": min(runs), "median": statistics.median(runs)}
+
+
+def _get_env(sources: Path) -> dict[str, str]:
+    """Get the environment to run the hooks with the sources of the checkout."""
+    return {**os.environ, "PYTHONPATH": str(sources.absolute())}
+
+
+def _command(env: dict[str, str], module: str, *args: str) -> Callable[[], object]:
+    """Run a hook in a new interpreter."""
+
+    def run() -> None:
+        subprocess.run(  # noqa: S603
+            [sys.executable, "-m", module, *args],
+            check=False,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+    return run
+
+
+@functools.cache
+def _get_help(sources: Path, module: str, command: tuple[str, ...]) -> Optional[str]:
+    """Get the help of the hook, None when the hook doesn't exist in the checkout."""
+    proc = subprocess.run(  # noqa: S603
+        [sys.executable, "-m", module, *command, "--help"],
+        check=False,
+        env=_get_env(sources),
+        encoding="utf-8",
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    return proc.stdout if proc.returncode == 0 else None
+
+
+def _is_supported(sources: Path, benchmark: _Benchmark) -> bool:
+    """Check that the hook and the options of the benchmark are supported by the checkout."""
+    help_ = _get_help(sources, benchmark.module, benchmark.command)
+    if help_ is None:
+        return False
+    options = [arg.split("=", 1)[0] for arg in benchmark.args if arg.startswith("--") and arg != "--"]
+    # e.g. '--cache' should not match '--cache-size'
+    return all(
+        re.search(rf"(^|[\s,\[]){re.escape(option)}([\s,=\]]|$)", help_, re.MULTILINE) for option in options
+    )
+
+
+def _get_benchmarks(repository: _Repository) -> dict[str, _Benchmark]:
+    """Get the benchmarks, by name."""
+    files = sorted(repository.files)
+    workflow = ".github/workflows/main.yaml"
+    prospector_configs = sorted(str(path) for path in Path("prospector").glob("*/.prospector.yaml"))
+    pyprojects = sorted(str(path) for path in Path("prospector").glob("*/pyproject.toml"))
+    reset = repository.reset
+    return {
+        "copyright-check": _Benchmark("sbrunner_hooks.copyright", files),
+        "copyright-check --batch": _Benchmark("sbrunner_hooks.copyright", ["--batch", *files]),
+        "copyright-check --batch --cache": _Benchmark(
+            "sbrunner_hooks.copyright", ["--batch", "--cache", *files], reset
+        ),
+        "copyright-check --batch --first-year": _Benchmark(
+            "sbrunner_hooks.copyright", ["--batch", "--first-year", *files], reset
+        ),
+        "copyright-check --all": _Benchmark("sbrunner_hooks.copyright", ["--all"]),
+        "sbrunner-canonicalize": _Benchmark(
+            "sbrunner_hooks.canonicalize",
+            [
+                workflow,
+                *prospector_configs,
+                "pyproject/pyproject.toml",
+                "pyproject-canonical/pyproject.toml",
+            ],
+            reset,
+        ),
+        "sbrunner-canonicalize --jobs=4": _Benchmark(
+            "sbrunner_hooks.canonicalize", ["--jobs=4", *prospector_configs], reset
+        ),
+        "sbrunner-canonicalize workflow": _Benchmark("sbrunner_hooks.canonicalize", [workflow], reset),
+        "sbrunner-canonicalize prospector": _Benchmark(
+            "sbrunner_hooks.canonicalize", [prospector_configs[0]], reset
+        ),
+        "sbrunner-canonicalize pyproject": _Benchmark(
+            "sbrunner_hooks.canonicalize", ["pyproject/pyproject.toml"], reset
+        ),
+        "sbrunner-canonicalize pyproject-canonical": _Benchmark(
+            "sbrunner_hooks.canonicalize", ["pyproject-canonical/pyproject.toml"], reset
+        ),
+        "workflow-timeout-check": _Benchmark("sbrunner_hooks.workflow_timeout", [workflow]),
+        "workflow-timeout-check --stream": _Benchmark(
+            "sbrunner_hooks.workflow_timeout", ["--stream", workflow]
+        ),
+        "prospector-to-ruff": _Benchmark("sbrunner_hooks.prospector_to_ruff", prospector_configs, reset),
+        "prospector-to-ruff --cache": _Benchmark(
+            "sbrunner_hooks.prospector_to_ruff", ["--cache", *prospector_configs], reset
+        ),
+        "run-in-dir": _Benchmark(
+            "sbrunner_hooks.run_in_dir", ["--pass-filename", "--cmd", "true", "--files", *pyprojects]
+        ),
+        "run-in-dir --jobs=4": _Benchmark(
+            "sbrunner_hooks.run_in_dir",
+            ["--jobs=4", "--pass-filename", "--cmd", "true", "--files", *pyprojects],
+        ),
+        "sbrunner-hooks run": _Benchmark(
+            "sbrunner_hooks.run_hooks",
+            ["run", "copyright:--batch", "workflows-require-timeout", "--", *files, workflow],
+            command=("run",),
+        ),
+    }
+
+
+def _compare(results: dict[str, Any], baseline: dict[str, Any], threshold: float) -> bool:
+    """Print the comparison with the baseline results, return False if a benchmark is slower."""
+    success = True
+    rows = [("Benchmark", "Baseline (s)", "Current (s)", "Ratio", "")]
+    for name, result in results["results"].items():
+        baseline_result = baseline["results"].get(name)
+        if baseline_result is None:
+            rows.append((name, "", f"{result['median']:.3f}", "", "new"))
+            continue
+        ratio = result["median"] / baseline_result["median"] if baseline_result["median"] else 1
+        status = ""
+        if ratio > 1 + threshold:
+            status = "slower"
+            success = False
+        elif ratio < 1 - threshold:
+            status = "faster"
+        rows.append(
+            (name, f"{baseline_result['median']:.3f}", f"{result['median']:.3f}", f"{ratio:.2f}", status),
+        )
+    widths = [max(len(row[index]) for row in rows) for index in range(len(rows[0]))]
+    for row in rows:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip())
+    return success
+
+
+def main() -> None:
+    """Benchmark the hooks on a synthetic Git repository."""
+    parser = argparse.ArgumentParser(description="Benchmark the hooks on a synthetic Git repository.")
+    parser.add_argument("--files", type=int, default=500, help="The number of source files")
+    parser.add_argument("--commits", type=int, default=50, help="The depth of the history")
+    parser.add_argument("--renames", type=int, default=20, help="The number of renamed files in the history")
+    parser.add_argument("--workflow-jobs", type=int, default=200, help="The number of jobs in the workflow")
+    parser.add_argument("--prospector-configs", type=int, default=20, help="The number of prospector configs")
+    parser.add_argument(
+        "--pyproject-tables", type=int, default=200, help="The number of tables in the pyproject"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="The seed of the random generator")
+    parser.add_argument("--repeat", type=int, default=5, help="The number of runs of each benchmark")
+    parser.add_argument("--filter", help="A regular expression to select the benchmarks to run")
+    parser.add_argument("--output", type=Path, help="Write the results in this JSON file")
+    parser.add_argument("--compare", type=Path, help="Compare the results with this JSON file")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="The relative difference of the median reported as slower or faster",
+    )
+    parser.add_argument("--keep", action="store_true", help="Keep the generated repository")
+    parser.add_argument(
+        "--sources",
+        type=Path,
+        default=_ROOT,
+        help="The checkout of the hooks to benchmark, e.g. a Git worktree of another commit (default: this one)",
+    )
+    args = parser.parse_args()
+
+    parameters = {
+        key: getattr(args, key)
+        for key in (
+            "files",
+            "commits",
+            "renames",
+            "workflow_jobs",
+            "prospector_configs",
+            "pyproject_tables",
+            "seed",
+        )
+    }
+    repository_path = Path(tempfile.mkdtemp(prefix="sbrunner-hooks-benchmark-")) / "repository"
+    original_cwd = Path.cwd()
+    try:
+        repository = _Repository(repository_path, args.seed, _get_env(args.sources))
+        start = time.perf_counter()
+        repository.create(args.files, args.commits, args.renames)
+        repository.create_fixtures(args.workflow_jobs, args.prospector_configs, args.pyproject_tables)
+        print(f"Repository generated in {time.perf_counter() - start:.1f} s: {repository_path}")
+
+        os.chdir(repository_path)
+        results: dict[str, Any] = {
+            "commit": subprocess.run(  # noqa: S603
+                [repository.git_cmd, "rev-parse", "HEAD"],
+                cwd=args.sources,
+                check=False,
+                encoding="utf-8",
+                stdout=subprocess.PIPE,
+            ).stdout.strip(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "parameters": parameters,
+            "results": {},
+            "skipped": [],
+        }
+        for name, benchmark in _get_benchmarks(repository).items():
+            if args.filter and not re.search(args.filter, name):
+                continue
+            if not _is_supported(args.sources, benchmark):
+                print(f"{name}: skipped, not supported by this commit")
+                results["skipped"].append(name)
+                continue
+            result = _time(
+                _command(repository.env, benchmark.module, *benchmark.args), args.repeat, benchmark.setup
+            )
+            results["results"][name] = result
+            print(f"{name}: {result['median']:.3f} s (min: {result['min']:.3f} s)")
+    finally:
+        os.chdir(original_cwd)
+        if not args.keep:
+            shutil.rmtree(repository_path.parent)
+
+    if args.output:
+        with args.output.open("w", encoding="utf-8") as output_file:
+            json.dump(results, output_file, indent=2)
+
+    if args.compare:
+        with args.compare.open(encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get("parameters") != parameters:
+            print("Warning: the baseline was run with different parameters")
+        if not _compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,15 @@
 """Pre-commit hooks."""
+
+import argparse
+
+
+def positive_int(value: str) -> int:
+    """Parse a strictly positive integer argument, e.g. the number of jobs."""
+    try:
+        result = int(value)
+    except ValueError:
+        result = 0
+    if result < 1:
+        message = f"invalid positive integer value: '{value}'"
+        raise argparse.ArgumentTypeError(message)
+    return result
@@ -0,0 +1,111 @@
+# Copyright (c) 2026, Stéphane Brunner
+"""Persistent cache shared by the hooks."""
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess  # nosec
+import tempfile
+from pathlib import Path
+from typing import Any, Optional
+
+_CACHE_VERSION = 1
+
+
+def get_cache_dir() -> Path:
+    """
+    Get the cache directory.
+
+    The cache is stored in the Git directory when we are in a Git repository,
+    otherwise in `$XDG_CACHE_HOME` (default `~/.cache`).
+    """
+    git_cmd = shutil.which("git")
+    if git_cmd is not None:
+        proc = subprocess.run(  # noqa: S603,RUF100
+            [git_cmd, "rev-parse", "--git-common-dir"],
+            check=False,
+            encoding="utf-8",
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        if proc.returncode == 0 and proc.stdout.strip():
+            return Path(proc.stdout.strip()).absolute() / "sbrunner-hooks"
+    xdg_cache_home = os.environ.get("XDG_CACHE_HOME")
+    cache_home = Path(xdg_cache_home) if xdg_cache_home else Path.home() / ".cache"
+    return cache_home / "sbrunner-hooks"
+
+
+def hash_inputs(*inputs: Any) -> str:
+    """Get a hash of the inputs used to compute the cached values."""
+    return hashlib.sha256(json.dumps([_CACHE_VERSION, *inputs]).encode()).hexdigest()
+
+
+class JsonCache:
+    """
+    A size bounded JSON cache.
+
+    The whole cache is invalidated when the inputs hash changes, and the least recently
+    used entries are evicted when there is more than `max_entries` entries.
+    """
+
+    def __init__(self, path: Path, inputs: str, max_entries: int = 10000) -> None:
+        self.path = path
+        self.inputs = inputs
+        self.max_entries = max_entries
+        self._entries = self._load()
+        self._updated: dict[str, Any] = {}
+
+    def _load(self) -> dict[str, Any]:
+        try:
+            with self.path.open(encoding="utf-8") as cache_file:
+                data = json.load(cache_file)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("inputs") != self.inputs:
+            return {}
+        entries = data.get("entries")
+        return entries if isinstance(entries, dict) else {}
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get a value from the cache, and mark it as recently used."""
+        if key not in self._entries:
+            return None
+        value = self._entries[key]
+        self.set(key, value)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Set a value in the cache."""
+        self._entries.pop(key, None)
+        self._entries[key] = value
+        self._updated.pop(key, None)
+        self._updated[key] = value
+
+    def save(self) -> None:
+        """Save the cache, merged with the entries written by the other processes in the meantime."""
+        if not self._updated:
+            return
+        entries = self._load()
+        for key, value in self._updated.items():
+            entries.pop(key, None)
+            entries[key] = value
+        for key in list(entries)[: max(0, len(entries) - self.max_entries)]:
+            del entries[key]
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                "w",
+                encoding="utf-8",
+                dir=self.path.parent,
+                prefix=f".{self.path.name}.",
+                delete=False,
+            ) as cache_file:
+                json.dump({"inputs": self.inputs, "entries": entries}, cache_file)
+            Path(cache_file.name).replace(self.path)
+        except OSError as error:
+            print(f"Unable to write the cache '{self.path}' ({error!s}).")
+        else:
+            self._entries = entries
+            self._updated = {}
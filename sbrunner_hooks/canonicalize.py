@@ -1,66 +1,124 @@
 # Copyright (c) 2025-2026, Stéphane Brunner
 
 import argparse
+import concurrent.futures
+import functools
 import io
 import re
+import shutil
+import subprocess  # nosec
+import sys
+from collections.abc import Callable, Sequence
 from pathlib import Path
-from typing import Any, AnyStr, Optional, Union
-
-import multi_repo_automation as mra
-import ruamel.yaml
-import tomlkit
-
-
-def _order_keys(
-    data: dict[str, Any],
-    first_keys: list[str],
-    last_keys: Optional[list[str]] = None,
-) -> ruamel.yaml.comments.CommentedMap:
-    if last_keys is None:
-        last_keys = []
-
-    # use order: <first_keys>, <other>, <last_keys>
-    new_data = [(key, data[key]) for key in first_keys if key in data]
-
-    new_data += [e for e in data.items() if e[0] not in [*first_keys, *last_keys]]
-
-    for key in last_keys:
-        if key in data:
-            new_data.append((key, data[key]))
-
-    return ruamel.yaml.comments.CommentedMap(new_data)
-
-
-def _order_sub_keys(
-    data: Union[dict[str, dict[str, Any]], list[dict[str, AnyStr]]],
-    first_keys: list[str],
-    last_keys: Optional[list[str]] = None,
-) -> None:
-    items = data.items() if isinstance(data, dict) else enumerate(data)
-    for key, value in items:
-        # copy the last comment
-        comment = None
-        if hasattr(value, "ca"):
-            last_value = list(value.values())[-1]
-            if isinstance(last_value, dict) and hasattr(last_value, "ca"):
-                last_last_key = list(last_value.keys())[-1]
-                comment = last_value.ca.items.get(last_last_key)
-                if comment is not None:
-                    del last_value.ca.items[last_last_key]
-            else:
-                comment = value.ca.items.get(list(value.keys())[-1])  # type: ignore[union-attr]
-        data[key] = _order_keys(value, first_keys, last_keys)  # type: ignore[index]
-        if comment is not None:
-            last_key = list(data[key].keys())[-1]  # type: ignore[index]
-            if isinstance(data[key][last_key], ruamel.yaml.comments.CommentedMap):  # type: ignore[index]
-                last_last_key = list(data[key][last_key].keys())[-1]  # type: ignore[union-attr,index]
-                data[key][last_key].ca.items[last_last_key] = comment  # type: ignore[union-attr,index]
+from typing import TYPE_CHECKING, Any, AnyStr, NamedTuple, Optional, Union
+
+from sbrunner_hooks import positive_int, trace
+from sbrunner_hooks.index import classify, get_index
+
+# The dependencies are imported in the functions that use them, to keep the startup fast
+if TYPE_CHECKING:
+    import multi_repo_automation as mra
+    import ruamel.yaml
+
+# The kinds of files (see `classify`) that can be canonicalized
+_KINDS = ("prospector", "pyproject", "pre-commit")
+
+
+class _KeyOrder:
+    """
+    A compiled key ordering rule.
+
+    The keys are ordered as: <first_keys>, <other keys, in the original order>, <last_keys>.
+    """
+
+    def __init__(self, first_keys: Sequence[str] = (), last_keys: Sequence[str] = ()) -> None:
+        self.first_keys = tuple(first_keys)
+        self.last_keys = tuple(last_keys)
+        # The slot of each first and last key, the other keys go between them
+        self._slots = {
+            **{key: index for index, key in enumerate(self.first_keys)},
+            **{key: len(self.first_keys) + index for index, key in enumerate(self.last_keys)},
+        }
+
+    def apply(self, data: dict[str, Any]) -> "ruamel.yaml.comments.CommentedMap":
+        """Get the ordered mapping, in one pass on the items."""
+        import ruamel.yaml  # noqa: PLC0415 # pylint: disable=import-outside-toplevel
+
+        slots: list[Optional[tuple[str, Any]]] = [None] * len(self._slots)
+        others = []
+        for item in data.items():
+            slot = self._slots.get(item[0])
+            if slot is None:
+                others.append(item)
             else:
-                data[key].ca.items[last_key] = comment  # type: ignore[union-attr,index]
+                slots[slot] = item
+        first_count = len(self.first_keys)
+        return ruamel.yaml.comments.CommentedMap(
+            [
+                *(item for item in slots[:first_count] if item is not None),
+                *others,
+                *(item for item in slots[first_count:] if item is not None),
+            ],
+        )
+
+    def apply_sub_keys(self, data: Union[dict[str, dict[str, Any]], list[dict[str, AnyStr]]]) -> None:
+        """Order the keys of each sub mapping, the comment of the last key stays at the end."""
+        import ruamel.yaml  # noqa: PLC0415 # pylint: disable=import-outside-toplevel
+
+        items = data.items() if isinstance(data, dict) else enumerate(data)
+        for key, value in items:
+            # copy the last comment
+            comment = None
+            if isinstance(value, ruamel.yaml.comments.CommentedMap) and value:
+                value_last_key = next(reversed(value))
+                last_value = value[value_last_key]
+                if isinstance(last_value, ruamel.yaml.comments.CommentedMap) and last_value:
+                    last_last_key = next(reversed(last_value))
+                    comment = last_value.ca.items.pop(last_last_key, None)
+                else:
+                    comment = value.ca.items.get(value_last_key)
+            new_value = self.apply(value)  # type: ignore[arg-type]
+            data[key] = new_value  # type: ignore[index]
+            if comment is not None:
+                last_key = next(reversed(new_value))
+                if isinstance(new_value[last_key], ruamel.yaml.comments.CommentedMap):
+                    new_value[last_key].ca.items[next(reversed(new_value[last_key]))] = comment
+                else:
+                    new_value.ca.items[last_key] = comment
+
+
+# The key ordering rules, by type of mapping
+_ORDERING_RULES = {
+    "workflow": _KeyOrder(["name", "on", "permissions", "env"], ["jobs"]),
+    "workflow-job": _KeyOrder(
+        ["name", "runs-on", "timeout-minutes", "if", "concurrency", "needs"],
+        ["strategy", "env", "steps"],
+    ),
+    "workflow-step": _KeyOrder(["name"], ["uses", "with", "run", "env", "if"]),
+    "prospector": _KeyOrder(
+        ["inherit"],
+        [
+            "pylint",
+            "mypy",
+            "bandit",
+            "ruff",
+            "pyflakes",
+            "pycodestyle",
+            "pydocstyle",
+            "mccabe",
+            "dodgy",
+            "pyroma",
+            "vulture",
+            "frosted",
+        ],
+    ),
+}
+
 
+def _canonicalize_workflow(workflow: "mra.EditYAML") -> None:
+    import ruamel.yaml  # noqa: PLC0415 # pylint: disable=import-outside-toplevel
 
-def _canonicalize_workflow(workflow: mra.EditYAML) -> None:
-    workflow.data = _order_keys(workflow.data, ["name", "on", "permissions", "env"], ["jobs"])
+    workflow.data = _ORDERING_RULES["workflow"].apply(workflow.data)
 
     # Add space after simple key
     for key in ["name"]:
@@ -80,15 +138,12 @@ def _canonicalize_workflow(workflow: mra.EditYAML) -> None:
             None,
         ]
 
+    job_order = _ORDERING_RULES["workflow-job"]
     for name, job in workflow["jobs"].items():
-        job = _order_keys(  # noqa: PLW2901
-            job,
-            ["name", "runs-on", "timeout-minutes", "if", "concurrency", "needs"],
-            ["strategy", "env", "steps"],
-        )
+        job = job_order.apply(job)  # noqa: PLW2901
         workflow["jobs"][name] = job
 
-        for key in reversed(["name", "runs-on", "timeout-minutes", "if", "concurrency", "needs"]):
+        for key in reversed(job_order.first_keys):
             if key in job:
                 job.ca.items[key] = [
                     None,
@@ -109,96 +164,374 @@ def _canonicalize_workflow(workflow: mra.EditYAML) -> None:
 
     for job in workflow["jobs"].values():
         if "steps" in job:
-            _order_sub_keys(job["steps"], ["name"], ["uses", "with", "run", "env", "if"])
-
-
-def _canonicalize_prospector(prospector: mra.EditYAML) -> None:
-    prospector.data = _order_keys(
-        prospector.data,
-        ["inherit"],
-        [
-            "pylint",
-            "mypy",
-            "bandit",
-            "ruff",
-            "pyflakes",
-            "pycodestyle",
-            "pydocstyle",
-            "mccabe",
-            "dodgy",
-            "pyroma",
-            "vulture",
-            "frosted",
-        ],
-    )
-
+            _ORDERING_RULES["workflow-step"].apply_sub_keys(job["steps"])
+
+
+def _canonicalize_prospector(prospector: "mra.EditYAML") -> None:
+    prospector.data = _ORDERING_RULES["prospector"].apply(prospector.data)
+
+
+class _Token(NamedTuple):
+    """A token of a regular expression, with its kind (see `_REGEX_TOKEN_RE`)."""
+
+    kind: str
+    text: str
+
+
+# The tokens of a verbose regular expression, the kind is the name of the matching group
+_REGEX_TOKEN_RE = re.compile(
+    r"""(?x)
+      # The whole escape sequences, like `\x41`, `\012` or `\N{EM DASH}`
+      (?P<escape>\\(?:x[0-9a-fA-F]{2}|u[0-9a-fA-F]{4}|U[0-9a-fA-F]{8}|N\{[^}]*\}|0[0-7]{0,2}|[1-7][0-7]{2}|.))
+      |(?P<set>\[\^?\]?(?:\\.|[^\]\\])*\])
+      # The inline flags, the comments and the named back references
+      |(?P<construct>\(\?(?:[aiLmsux]+|\#[^)]*|P=\w+)\))
+      |(?P<open>\((?:\?(?:P?<\w+>|[:=!>]|<[=!]|[aiLmsux-]+:|\(\w+\)))?)
+      |(?P<close>\))
+      |(?P<alternation>\|)
+      |(?P<quantifier>[*+?]|\{\d*,?\d*\})
+      |(?P<space>\s)
+      |(?P<comment>\#)
+      |(?P<char>.)
+    """,
+    re.DOTALL,
+)
+# The back references, the numbering of the groups should be kept, the atomic groups, the flags and the
+# conditional groups, where the order of the alternatives or the grouping can change the matches
+_NOT_FACTORABLE_RE = re.compile(r"^(?:\\[1-9]|\(\?(?:P=|\(|>|[aiLmsux-]))")
+
+
+def _tokenize_regex(pattern: str) -> list[_Token]:
+    """Split a verbose regular expression in tokens, the insignificant spaces are removed."""
+    return [
+        _Token(match.lastgroup or "char", match.group())
+        for match in _REGEX_TOKEN_RE.finditer(pattern)
+        if match.lastgroup != "space"
+    ]
+
+
+def _join(tokens: Sequence[_Token]) -> str:
+    return "".join(token.text for token in tokens)
+
+
+def _split_alternatives(tokens: Sequence[_Token]) -> list[list[_Token]]:
+    """Split the tokens on the alternations that are not in a group."""
+    alternatives: list[list[_Token]] = [[]]
+    depth = 0
+    for token in tokens:
+        if token.kind == "alternation" and depth == 0:
+            alternatives.append([])
+            continue
+        if token.kind == "open":
+            depth += 1
+        elif token.kind == "close":
+            depth -= 1
+        alternatives[-1].append(token)
+    return alternatives
+
+
+def _split_group(tokens: list[_Token]) -> Optional[tuple[str, list[_Token], str]]:
+    """
+    Split the tokens in the start, up to the opening of the first group, the content of the group, and the end.
+
+    None if the pattern has an alternation outside of the group.
+    """
+    open_index = next((index for index, token in enumerate(tokens) if token.kind == "open"), None)
+    if open_index is None:
+        return None
+    depth = 0
+    for close_index in range(open_index, len(tokens)):
+        if tokens[close_index].kind == "open":
+            depth += 1
+        elif tokens[close_index].kind == "close":
+            depth -= 1
+            if depth == 0:
+                break
+    else:
+        return None
+    start, end = tokens[: open_index + 1], tokens[close_index:]
+    if len(_split_alternatives(start)) > 1 or len(_split_alternatives(end[1:])) > 1:
+        return None
+    return _join(start), tokens[open_index + 1 : close_index], _join(end)
+
+
+def _factor_prefixes(alternatives: list[list[_Token]]) -> list[str]:
+    """
+    Factor the leading atoms shared by the alternatives, like a trie: `ab|ac` gives `a(?:b|c)`.
+
+    The alternatives are grouped at the position of the first one of the group.
+    """
+    entries: list[tuple[Optional[str], list[list[_Token]]]] = []
+    rests_by_head: dict[str, list[list[_Token]]] = {}
+    for alternative in alternatives:
+        head = None
+        # Only the literal characters and the escapes are factored, not when they are followed by a quantifier
+        if (
+            alternative
+            and (
+                alternative[0].kind == "escape"
+                or (alternative[0].kind == "char" and alternative[0].text not in ".^$")
+            )
+            and (len(alternative) == 1 or alternative[1].kind != "quantifier")
+        ):
+            head = alternative[0].text
+        if head is None:
+            entries.append((None, [alternative]))
+        elif head in rests_by_head:
+            rests_by_head[head].append(alternative[1:])
+        else:
+            rests_by_head[head] = [alternative[1:]]
+            entries.append((head, rests_by_head[head]))
 
-def _split_pipe(exclude: str) -> list[str]:
     result = []
-    in_parent = False
-    file = ""
-
-    for char in exclude:
-        if char == "(":
-            in_parent = True
-        elif char == ")":
-            in_parent = False
-        elif char == "|" and not in_parent:
-            result.append(file.strip())
-            file = ""
-        file += char
-
-    result.append(file.strip())
+    for head, rests in entries:
+        if head is None:
+            result.append(_join(rests[0]))
+        elif len(rests) == 1:
+            result.append(head + _join(rests[0]))
+        else:
+            factored = _factor_prefixes(rests)
+            result.append(head + (factored[0] if len(factored) == 1 else f"(?:{'|'.join(factored)})"))
     return result
 
 
-_CLEAN_ENDLINE_RE = re.compile(r"\s*\n\s*")
-_GET_START_END_RE = re.compile(r"([^(]*\()(.*)(\)[^)]*)")
-
-
-def _canonicalize_pre_commit_exclude(exclude: str) -> Optional[ruamel.yaml.scalarstring.LiteralScalarString]:
+def _optimize_alternatives(alternatives: list[list[_Token]]) -> Optional[list[str]]:
+    """Remove the duplicated alternatives and factor their prefixes, None if it's not possible."""
+    for alternative in alternatives:
+        for token, next_token in zip(alternative, [*alternative[1:], None]):
+            if _NOT_FACTORABLE_RE.match(token.text) or (
+                # The possessive quantifiers
+                token.kind == "quantifier" and next_token is not None and next_token.text == "+"
+            ):
+                return None
+    unique: dict[str, list[_Token]] = {}
+    for alternative in alternatives:
+        unique.setdefault(_join(alternative), alternative)
+    return _factor_prefixes(list(unique.values()))
+
+
+def _match_same_paths(pattern: str, other_pattern: str, paths: list[str]) -> bool:
+    """
+    Check that the patterns match the same paths, with `re.search` like pre-commit.
+
+    Only a sanity check, the excluded files are often not tracked.
+    """
+    try:
+        other_re = re.compile(other_pattern)
+    except re.error:
+        return False
+    pattern_re = re.compile(pattern)
+    return all(bool(pattern_re.search(path)) == bool(other_re.search(path)) for path in paths)
+
+
+def _canonicalize_pre_commit_exclude(
+    exclude: str,
+    paths: Optional[list[str]] = None,
+    messages: Optional[list[str]] = None,
+) -> Optional["ruamel.yaml.scalarstring.LiteralScalarString"]:
+    """
+    Format a verbose exclude pattern with one alternative per line.
+
+    With the paths, the pattern is also optimized, the factoring is equivalent by construction, and as a
+    sanity check the optimized pattern is only used if it matches the same paths.
+    """
+    import ruamel.yaml  # noqa: PLC0415 # pylint: disable=import-outside-toplevel
+
+    original = exclude
     exclude = exclude.strip()
     if not exclude.startswith("(?x)"):
         return None
-    exclude = exclude[4:]
-    exclude = exclude.strip()
-    exclude = _CLEAN_ENDLINE_RE.sub("", exclude)
-    get_intro_end_match = _GET_START_END_RE.match(exclude)
-    if get_intro_end_match is None:
+    tokens = _tokenize_regex(exclude[4:])
+    if any(token.kind == "comment" for token in tokens):
+        # The comments end with the end of line, they can't be moved
+        return None
+    split = _split_group(tokens)
+    if split is None:
         return None
-    start, exclude, end = get_intro_end_match.groups()
+    start, content, end = split
 
-    files = _split_pipe(exclude)
+    files = [_join(alternative) for alternative in _split_alternatives(content)]
+    if paths is not None:
+        optimized = _optimize_alternatives(_split_alternatives(content))
+        if optimized is not None and optimized != files:
+            if _match_same_paths(original, f"(?x){start}{'|'.join(optimized)}{end}", paths):
+                files = optimized
+            elif messages is not None:
+                messages.append(f"The optimized exclude doesn't match the same files, not used: {exclude}")
 
     return ruamel.yaml.scalarstring.LiteralScalarString(
         "\n".join(
             [
                 f"(?x){start}",
-                *[f"  {file}" for file in files],
+                *[f"  {'|' if index else ''}{file}" for index, file in enumerate(files)],
                 end,
             ],
         ),
     )
 
 
-def _canonicalize_pre_commit(pre_commit_path: Path) -> None:
-    with mra.EditYAML(pre_commit_path, run_pre_commit=False) as pre_commit_config:
+def _get_repository_paths() -> Optional[list[str]]:
+    """Get the paths of the tracked files, relative to the repository root, like used by pre-commit."""
+    git_cmd = shutil.which("git")
+    if git_cmd is None:
+        return None
+    try:
+        repository_index = get_index(git_cmd)
+    except subprocess.CalledProcessError:
+        return None
+    return [repository_index.get_path(file_name) for file_name in repository_index.files()]
+
+
+def _canonicalize_pre_commit(pre_commit_path: Path, optimize_exclude: bool = False) -> list[str]:
+    """Canonicalize the pre-commit configuration, return the messages to be printed."""
+    import multi_repo_automation as mra  # noqa: PLC0415 # pylint: disable=import-outside-toplevel
+
+    messages: list[str] = []
+    paths = None
+    if optimize_exclude:
+        paths = _get_repository_paths()
+        if paths is None:
+            messages.append("Git is required to check the optimized excludes, they are not optimized")
+
+    with (
+        trace.span("mra.EditYAML", file=str(pre_commit_path)),
+        mra.EditYAML(pre_commit_path, run_pre_commit=False) as pre_commit_config,
+    ):
         if "exclude" in pre_commit_config:
-            exclude = _canonicalize_pre_commit_exclude(pre_commit_config["exclude"])
+            exclude = _canonicalize_pre_commit_exclude(pre_commit_config["exclude"], paths, messages)
             if exclude is not None:
                 pre_commit_config["exclude"] = exclude
 
         for repo in pre_commit_config["repos"]:
             for hook in repo["hooks"]:
                 if "exclude" in hook:
-                    exclude = _canonicalize_pre_commit_exclude(hook["exclude"])
+                    exclude = _canonicalize_pre_commit_exclude(hook["exclude"], paths, messages)
                     if exclude is not None:
                         hook["exclude"] = exclude
+    return messages
+
+
+_TOML_TABLE_HEADER_RE = re.compile(r"^\[\[?([A-Za-z0-9_-]+(?:\.[A-Za-z0-9_-]+)*)\]\]?\s*(?:#.*)?$")
+_TOML_KEY_RE = re.compile(
+    r"""^\s*(?:[A-Za-z0-9_-]+|"[^"]*"|'[^']*')(?:\s*\.\s*(?:[A-Za-z0-9_-]+|"[^"]*"|'[^']*'))*\s*=""",
+)
+
+
+def _toml_scan_line(line: str, depth: int, quote: Optional[str]) -> Optional[tuple[int, Optional[str]]]:
+    """
+    Get the bracket depth and the opened multi-line string at the end of the line.
+
+    The strings and the comments are ignored, return None on unexpected syntax.
+    """
+    index = 0
+    escape = False
+    while index < len(line):
+        char = line[index]
+        if quote is not None:
+            if escape:
+                escape = False
+            elif char == "\\" and quote[0] == '"':
+                escape = True
+            elif line.startswith(quote, index):
+                index += len(quote)
+                quote = None
+                continue
+        elif line.startswith(('"""', "'''"), index):
+            quote = line[index : index + 3]
+            index += 3
+            continue
+        elif char in "\"'":
+            quote = char
+        elif char == "#":
+            break
+        elif char in "[{":
+            depth += 1
+        elif char in "]}":
+            depth -= 1
+        index += 1
+    # Unclosed single line string or unbalanced brackets
+    if (quote is not None and len(quote) == 1) or depth < 0:
+        return None
+    return depth, quote
+
+
+def _is_canonical_pyproject(content: str) -> bool:
+    """
+    Check without parsing that the pyproject.toml is already in the canonical form.
+
+    This is conservative, in case of doubt, we return False to do the full canonicalization.
+    """
+    if not content:
+        return True
+    if "\r" in content or content.startswith("\n") or "\n\n\n" in content or content.endswith("\n\n"):
+        # Double end of line
+        return False
+
+    lines = content.split("\n")
+    order: list[tuple[Any, ...]] = []
+    group_tables: list[list[str]] = []
+    depth = 0
+    quote: Optional[str] = None
+    for index, line in enumerate(lines):
+        if depth > 0 or quote is not None:
+            state = _toml_scan_line(line, depth, quote)
+            if state is None:
+                return False
+            depth, quote = state
+            continue
+        if line == "":
+            continue
+        if line.lstrip().startswith("#"):
+            # Comments are only kept as is inside the tables, before a key or another comment
+            next_line = lines[index + 1] if index + 1 < len(lines) else ""
+            if not order or next_line == "" or next_line.startswith("["):
+                return False
+            continue
+        if line.startswith("["):
+            header_match = _TOML_TABLE_HEADER_RE.match(line)
+            if header_match is None:
+                return False
+            keys = header_match.group(1).split(".")
+            if keys[0] == "tool":
+                if len(keys) == 1:
+                    return False
+                order.append((0, 0 if keys[1] == "ruff" else 1, keys[1]))
+            elif keys[0] == "build-system":
+                order.append((2,))
+            else:
+                order.append((1, keys[0]))
+            if len(order) > 1:
+                if order[-2] > order[-1]:
+                    return False
+                if order[-2] != order[-1]:
+                    # New group, should be separated by an empty line
+                    if lines[index - 1] != "":
+                        return False
+                    group_tables = []
+                elif any(table[: len(keys)] == keys for table in group_tables):
+                    # Parent table after its sub table
+                    return False
+            group_tables.append(keys)
+            continue
+        if not order or not _TOML_KEY_RE.match(line):
+            return False
+        state = _toml_scan_line(line, 0, None)
+        if state is None:
+            return False
+        depth, quote = state
+    return depth == 0 and quote is None
 
 
 def _canonicalize_pyproject(path: Path) -> None:
     with path.open() as f:
-        doc = tomlkit.parse(f.read())
+        content = f.read()
+    if _is_canonical_pyproject(content):
+        return
+
+    import tomlkit  # noqa: PLC0415 # pylint: disable=import-outside-toplevel
+
+    with trace.span("tomlkit.parse", file=str(path)):
+        doc = tomlkit.parse(content)
 
     new_doc = tomlkit.document()
     if "tool" in doc and isinstance(doc["tool"], dict):
@@ -217,7 +550,8 @@ def _canonicalize_pyproject(path: Path) -> None:
 
     # Remove double end of line
     out = io.StringIO()
-    tomlkit.dump(new_doc, out, sort_keys=False)
+    with trace.span("tomlkit.dump", file=str(path)):
+        tomlkit.dump(new_doc, out, sort_keys=False)
     new_lines = []
     last_empty = False
     for line in out.getvalue().split("\n"):
@@ -234,36 +568,155 @@ def _canonicalize_pyproject(path: Path) -> None:
         f.write("\n".join(new_lines))
 
 
+def _canonicalize_file(file_path: Path, kind: Optional[str], optimize_exclude: bool = False) -> list[str]:
+    """Canonicalize a file, according to its kind (see `classify`), return the messages to be printed."""
+    if kind == "workflow":
+        # The GitHub workflows are not canonicalized by `_canonicalize_workflow`, as before (the old path
+        # check never matched), the reordering of the steps loses some comments
+        return []
+
+    if kind == "prospector":
+        import multi_repo_automation as mra  # noqa: PLC0415 # pylint: disable=import-outside-toplevel
+
+        with (
+            trace.span("mra.EditYAML", file=str(file_path)),
+            mra.EditYAML(file_path, run_pre_commit=False) as e,
+        ):
+            _canonicalize_prospector(e)
+        return [f"Format {file_path} as a Prospector configuration"]
+
+    if kind == "pyproject":
+        _canonicalize_pyproject(file_path)
+        return [f"Format {file_path} as a pyproject.toml"]
+
+    if kind == "pre-commit":
+        messages = _canonicalize_pre_commit(file_path, optimize_exclude)
+        return [f"Format {file_path} as a pre-commit configuration", *messages]
+
+    return []
+
+
+def _print_result(file_path: Path, get_messages: Callable[[], list[str]]) -> bool:
+    """Print the messages of the canonicalization of a file, return the success."""
+    try:
+        messages = get_messages()
+    except Exception as error:  # noqa: BLE001 # pylint: disable=broad-exception-caught
+        print(f"Error while formatting {file_path}: {error!s}")
+        return False
+    for message in messages:
+        print(message)
+    return True
+
+
+def _canonicalize_files(
+    files: list[tuple[Path, Optional[str]]],
+    jobs: int = 1,
+    optimize_exclude: bool = False,
+) -> bool:
+    """Canonicalize the files, with their kind, return the success."""
+    success = True
+    if jobs > 1 and len(files) > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = [
+                executor.submit(_canonicalize_file, file_path, kind, optimize_exclude)
+                for file_path, kind in files
+            ]
+            for (file_path, _), future in zip(files, futures):
+                if not _print_result(file_path, future.result):
+                    success = False
+    else:
+        for file_path, kind in files:
+            with trace.span("canonicalize file", file=str(file_path), kind=kind):
+                if not _print_result(
+                    file_path,
+                    functools.partial(_canonicalize_file, file_path, kind, optimize_exclude),
+                ):
+                    success = False
+    return success
+
+
+def _watch(files: list[tuple[Path, Optional[str]]], jobs: int = 1, optimize_exclude: bool = False) -> None:
+    """Canonicalize the files, then the changed files, until interrupted."""
+    from sbrunner_hooks import watch  # noqa: PLC0415 # pylint: disable=import-outside-toplevel
+
+    _canonicalize_files(files, jobs, optimize_exclude)
+    git_cmd = shutil.which("git")
+    try:
+        get_path = get_index(git_cmd).get_path if git_cmd is not None else str
+    except subprocess.CalledProcessError:
+        get_path = str
+
+    def get_kind(file_name: str) -> Optional[str]:
+        return classify(get_path(file_name))
+
+    try:
+        watch.watch(
+            watch.get_directories([file_path.as_posix() for file_path, _ in files]),
+            lambda file_name: get_kind(file_name) in _KINDS,
+            lambda file_names: _canonicalize_files(
+                [(Path(file_name), get_kind(file_name)) for file_name in file_names],
+                jobs,
+                optimize_exclude,
+            ),
+        )
+    except KeyboardInterrupt:
+        pass
+
+
 def main() -> None:
     """Update the copyright header of the files."""
     args_parser = argparse.ArgumentParser("Format some files like the GitHub workflow")
+    args_parser.add_argument(
+        "--jobs",
+        type=positive_int,
+        default=1,
+        help="The number of files processed concurrently, in different processes",
+    )
+    args_parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Canonicalize all the files tracked by Git, without using pre-commit",
+    )
+    args_parser.add_argument(
+        "--optimize-exclude",
+        action="store_true",
+        help="Remove the duplicated alternatives of the pre-commit excludes and factor their common "
+        "prefixes, when the result matches the same files tracked by Git",
+    )
+    args_parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Canonicalize the files, then watch the directories of the tracked files, "
+        "and canonicalize the changed files, until interrupted",
+    )
+    trace.add_argument(args_parser)
     args_parser.add_argument("files", nargs=argparse.REMAINDER, type=Path, help="The files to update")
     args = args_parser.parse_args()
+    trace.setup(args.trace)
+
+    # The files with their kind, the kind of the given files is got from their path,
+    # relative to the repository root like with pre-commit
+    files = [(file_path, classify(file_path.as_posix())) for file_path in args.files]
+    if args.all:
+        git_cmd = shutil.which("git")
+        if git_cmd is None:
+            args_parser.error("Git is required with --all")
+        try:
+            repository_index = get_index(git_cmd)
+        except subprocess.CalledProcessError as error:
+            print(f"Error while listing the files with Git ({error!s}).")
+            sys.exit(1)
+        files += [
+            (Path(file_name), classify(repository_index.get_path(file_name)))
+            for file_name in repository_index.files(_KINDS)
+        ]
 
-    for file_path in args.files:
-        # is subpath of .github/workflows
-        if file_path.parts[:3] == (".github", "workflows"):
-            print(f"Format {file_path} as a GitHub workflow")
-            with mra.EditYAML(file_path, run_pre_commit=False) as e:
-                _canonicalize_workflow(e)
-
-        elif (
-            file_path.name in (".prospector.yaml", ".prospector.yml", "prospector.yaml", "prospector.yml")
-            or file_path.name.startswith(".prospector-")
-            or file_path.name.startswith("prospector-")
-            or (len(file_path.parts) == 2 and file_path.parts[0].startswith("prospector_"))
-        ):
-            print(f"Format {file_path} as a Prospector configuration")
-            with mra.EditYAML(file_path, run_pre_commit=False) as e:
-                _canonicalize_prospector(e)
-
-        elif file_path.name == "pyproject.toml":
-            print(f"Format {file_path} as a pyproject.toml")
-            _canonicalize_pyproject(file_path)
+    if args.watch:
+        _watch(files, args.jobs, args.optimize_exclude)
+        return
 
-        elif file_path.name in (".pre-commit-config.yaml", ".pre-commit-config.yml"):
-            print(f"Format {file_path} as a pre-commit configuration")
-            _canonicalize_pre_commit(file_path)
+    if not _canonicalize_files(files, args.jobs, args.optimize_exclude):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
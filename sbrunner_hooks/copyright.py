@@ -2,23 +2,54 @@
 """Update the copyright header of the files."""
 
 import argparse
+import codecs
+import concurrent.futures
+import contextlib
 import datetime
+import functools
+import mmap
+import os
 import re
 import shutil
 import subprocess  # nosec
 import sys
+from collections.abc import Callable, Generator
 from datetime import timezone
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any, Optional, Union
 
-import yaml
+from sbrunner_hooks import index, positive_int, trace, yaml_loader
+from sbrunner_hooks.cache import JsonCache, get_cache_dir, hash_inputs
 
 if TYPE_CHECKING:
     StrPattern = re.Pattern[str]
+    BytesPattern = re.Pattern[bytes]
 else:
     StrPattern = re.Pattern
+    BytesPattern = re.Pattern
 
-CURRENT_YEAR = str(datetime.datetime.now(timezone.utc).year)
+# The default patterns, the word boundaries are on the ASCII word characters (like `\b` on bytes),
+# to search the files as bytes
+DEFAULT_ONE_DATE_RE = r"(?<![0-9A-Za-z_])Copyright \(c\) (?P<year>[0-9]{4})(?![0-9A-Za-z_])"
+DEFAULT_TWO_DATE_RE = r"(?<![0-9A-Za-z_])Copyright \(c\) (?P<from>[0-9]{4})-(?P<to>[0-9]{4})(?![0-9A-Za-z_])"
+_YEAR_RE = re.compile(r"^(?P<year>[0-9]{4})-")
+# The escapes, the set openings, the group extensions and the other characters of a pattern
+_PATTERN_TOKEN_RE = re.compile(r"\\.|\[\^?|\(\?[^:=!<P]?|.", re.DOTALL)
+_BYTES_SAFE_TOKEN_RE = re.compile(r"\\[^a-zA-Z0-9]|\[|\(\?[:=!<P]?|[^.]", re.DOTALL)
+# Like Git, a file with a null byte in the first 8000 bytes is considered as binary
+_BINARY_CHECK_SIZE = 8000
+
+# The Git state of a file: (is modified, last commit date) or the Git error
+_GitState = Union[tuple[bool, str], subprocess.CalledProcessError]
+
+
+class _BinaryFileError(Exception):
+    """The file is a binary file."""
+
+
+def get_current_year() -> str:
+    """Get the current year, at each run, the daemon can run over the new year."""
+    return str(datetime.datetime.now(timezone.utc).year)
 
 
 def main() -> None:
@@ -27,110 +58,751 @@ def main() -> None:
     args_parser.add_argument("--config", help="The configuration file", default=".github/copyright.yaml")
     args_parser.add_argument("--required", action="store_true", help="The copyright is required")
     args_parser.add_argument("--verbose", action="store_true", help="Verbose mode")
+    args_parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Get the Git information of all the files with one 'git status' and one 'git log' call",
+    )
+    args_parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Cache the copyright year and status of the unchanged files, in the Git directory",
+    )
+    args_parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=10000,
+        help="The maximum number of files in the cache",
+    )
+    args_parser.add_argument(
+        "--jobs",
+        type=positive_int,
+        default=os.cpu_count(),
+        help="The number of files processed concurrently (default: the number of CPUs)",
+    )
+    files_group = args_parser.add_mutually_exclusive_group()
+    files_group.add_argument(
+        "--all",
+        action="store_true",
+        help="Check all the files tracked by Git, implies --batch",
+    )
+    files_group.add_argument(
+        "--since",
+        metavar="REF",
+        help="Check the files changed since the Git reference (committed or not), implies --batch",
+    )
+    args_parser.add_argument(
+        "--first-year",
+        action="store_true",
+        help="Also fix the first year of the copyright, from the first commit of the file (following the "
+        "renames), with one 'git log' call on the whole history",
+    )
+    args_parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Update the files, then watch the directories of the tracked files, "
+        "and update the changed tracked files, until interrupted",
+    )
+    trace.add_argument(args_parser)
     args_parser.add_argument("files", nargs=argparse.REMAINDER, help="The files to update")
     args = args_parser.parse_args()
+    trace.setup(args.trace)
+
+    if args.verbose:
+        yaml_loader.print_backend()
 
     config = {}
+    config_content = ""
     config_path = Path(args.config)
     if config_path.exists():
-        with config_path.open(encoding="utf-8") as config_file:
-            config = yaml.load(config_file, Loader=yaml.SafeLoader)
+        with trace.span("load config", file=str(config_path)):
+            with config_path.open(encoding="utf-8") as config_file:
+                config_content = config_file.read()
+            config = yaml_loader.load(config_content)
 
-    one_date_re = re.compile(config.get("one_date_re", r"\bCopyright \(c\) (?P<year>[0-9]{4})\b"))
-    two_date_re = re.compile(
-        config.get("two_date_re", r"\bCopyright \(c\) (?P<from>[0-9]{4})-(?P<to>[0-9]{4})\b"),
-    )
+    git_cmd = shutil.which("git")
+
+    if args.all or args.since:
+        if git_cmd is None:
+            args_parser.error("Git is required with --all and --since")
+        try:
+            args.files = [*args.files, *_list_files(git_cmd, args.since)]
+        except subprocess.CalledProcessError as error:
+            print(f"Error while listing the files with Git ({error!s}).")
+            sys.exit(1)
+        args.batch = True
+
+    if args.watch:
+        _watch(args, config, config_content, git_cmd)
+        return
+
+    if not _update_files(args, args.files, config, config_content, git_cmd):
+        sys.exit(1)
+
+
+def _watch(
+    args: argparse.Namespace, config: dict[str, Any], config_content: str, git_cmd: Optional[str]
+) -> None:
+    """Update the files, then the changed files, until interrupted."""
+    from sbrunner_hooks import watch  # noqa: PLC0415 # pylint: disable=import-outside-toplevel
+
+    def accept(file_name: str) -> bool:
+        if git_cmd is None:
+            return file_name in args.files
+        try:
+            return index.get_index(git_cmd).get_info(file_name) is not None
+        except subprocess.CalledProcessError:
+            return file_name in args.files
+
+    def process(file_names: list[str]) -> None:
+        # The state of the working tree changed
+        index.clear()
+        _update_files(args, file_names, config, config_content, git_cmd)
+
+    if args.files:
+        _update_files(args, args.files, config, config_content, git_cmd)
+    try:
+        watch.watch(watch.get_directories(args.files), accept, process)
+    except KeyboardInterrupt:
+        pass
+
+
+def _update_files(
+    args: argparse.Namespace,
+    files_to_check: list[str],
+    config: dict[str, Any],
+    config_content: str,
+    git_cmd: Optional[str],
+) -> bool:
+    """Update the copyright header of the files, return the success."""
+    one_date_re = re.compile(config.get("one_date_re", DEFAULT_ONE_DATE_RE))
+    two_date_re = re.compile(config.get("two_date_re", DEFAULT_TWO_DATE_RE))
     one_date_format = config.get("one_date_format", "Copyright (c) {year}")
     two_date_format = config.get("two_date_format", "Copyright (c) {from}-{to}")
-    year_re = re.compile(r"^(?P<year>[0-9]{4})-")
     license_file = config.get("license_file", "LICENSE")
+    header_lines = config.get("header_lines")
+    header_bytes = config.get("header_bytes")
 
-    git_cmd = shutil.which("git")
-    success = True
-    no_git_log = False
-    for file_name in args.files:
+    current_year = get_current_year()
+    cache = None
+    cache_keys: dict[str, str] = {}
+    used_years: dict[str, str] = {}
+    first_years: dict[str, str] = {}
+    up_to_date_files = set()
+    if args.cache and git_cmd is not None:
+        cache_keys = _get_cache_keys(git_cmd, files_to_check)
+        cache = JsonCache(
+            get_cache_dir() / "copyright.json",
+            hash_inputs(config_content, current_year, args.required, args.first_year),
+            args.cache_size,
+        )
+        for file_name, cache_key in cache_keys.items():
+            cached = cache.get(cache_key)
+            if cached is not None:
+                used_years[file_name], file_success = cached
+                if file_success:
+                    up_to_date_files.add(file_name)
+    files = [file_name for file_name in files_to_check if file_name not in used_years]
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.jobs) as executor:
         if git_cmd is None:
-            if not no_git_log:
+            if files:
                 print("No Git found.")
-                no_git_log = True
-            used_year = CURRENT_YEAR
+            used_years.update(dict.fromkeys(files, current_year))
+        elif args.first_year:
+            history_states, first_years = _get_git_states_history(git_cmd, files, license_file)
+            used_years.update(_get_used_years(files, history_states, args.verbose, current_year))
+        elif args.batch:
+            used_years.update(
+                _get_used_years(
+                    files,
+                    _get_git_states_batch(git_cmd, files, license_file),
+                    args.verbose,
+                    current_year,
+                ),
+            )
+        else:
+            states = executor.map(
+                functools.partial(_get_git_state, git_cmd, license_file=license_file),
+                files,
+            )
+            used_years.update(_get_used_years(files, dict(zip(files, states)), args.verbose, current_year))
+
+        update = functools.partial(
+            update_file,
+            one_date_re=one_date_re,
+            two_date_re=two_date_re,
+            one_date_format=one_date_format,
+            two_date_format=two_date_format,
+            required=args.required,
+            verbose=args.verbose,
+            current_year=current_year,
+        )
+        files = [file_name for file_name in files_to_check if file_name not in up_to_date_files]
+        process = functools.partial(
+            _process_file,
+            update=update,
+            bytes_patterns=_get_bytes_patterns(one_date_re, two_date_re),
+            header_lines=header_lines,
+            header_bytes=header_bytes,
+            max_size=config.get("max_size"),
+            verbose=args.verbose,
+        )
+
+        def process_file(file_name: str) -> tuple[bool, bool, list[str]]:
+            with trace.span("update file", file=file_name):
+                return process(file_name, used_years[file_name], first_year=first_years.get(file_name))
+
+        results = executor.map(process_file, files)
+
+        success = True
+        for file_name in files_to_check:
+            if file_name in up_to_date_files:
+                if args.verbose:
+                    print(f"File '{file_name}' is up to date in the cache.")
+                continue
+            file_success, changed, messages = next(results)
+            for message in messages:
+                print(message)
+            if cache is not None and file_name in cache_keys and not changed:
+                cache.set(cache_keys[file_name], [used_years[file_name], file_success])
+            if not file_success:
+                success = False
+
+    if cache is not None:
+        cache.save()
+
+    return success
+
+
+def _list_files(git_cmd: str, since: Optional[str] = None) -> list[str]:
+    """
+    List the files to be checked, relative to the current directory, with one Git call.
+
+    All the tracked files, or the files changed since the reference, committed or not.
+    """
+    if since is None:
+        return index.get_index(git_cmd).files()
+    files = subprocess.run(  # noqa: S603,RUF100
+        [git_cmd, "diff", "--name-only", "--relative", "--diff-filter=d", "-z", since, "--"],
+        check=True,
+        stdout=subprocess.PIPE,
+    ).stdout
+    return [
+        file_name
+        for file_name in (os.fsdecode(entry) for entry in files.split(b"\0") if entry)
+        if Path(file_name).is_file() and not Path(file_name).is_symlink()
+    ]
+
+
+def _process_file(
+    file_name: str,
+    used_year: str,
+    update: Callable[..., tuple[bool, str]],
+    bytes_patterns: Optional[tuple[BytesPattern, BytesPattern]],
+    header_lines: Optional[int],
+    header_bytes: Optional[int],
+    max_size: Optional[int],
+    verbose: bool,
+    first_year: Optional[str] = None,
+) -> tuple[bool, bool, list[str]]:
+    """
+    Update the copyright of a file.
+
+    Return the success, if the content changed and the messages to be printed.
+    """
+    messages: list[str] = []
+    if max_size is not None and Path(file_name).stat().st_size > max_size:
+        if verbose:
+            messages.append(f"File '{file_name}' is bigger than {max_size} bytes, skipped.")
+        return True, False, messages
+
+    file_update = functools.partial(
+        update,
+        last_year=used_year,
+        first_year=first_year,
+        filename=file_name,
+        print_function=messages.append,
+    )
+    try:
+        if header_lines is None and header_bytes is None:
+            file_success, changed = _update_whole_file(
+                file_name, used_year, file_update, bytes_patterns, first_year
+            )
         else:
-            try:
-                status_str = subprocess.run(  # noqa: S603,RUF100
-                    [git_cmd, "status", "--porcelain", "--", file_name],
+            file_success, changed = _update_file_header(file_name, file_update, header_lines, header_bytes)
+    except _BinaryFileError:
+        if verbose:
+            messages.append(f"File '{file_name}' is a binary file, skipped.")
+        return True, False, messages
+    except UnicodeDecodeError as error:
+        messages.append(f"File '{file_name}' is not a valid UTF-8 file, skipped ({error!s}).")
+        return True, False, messages
+    if not file_success and verbose:
+        messages.append(f"Copyright updated in '{file_name}'.")
+    return file_success, changed, messages
+
+
+def _is_bytes_safe(pattern: StrPattern) -> bool:
+    """
+    Check that the pattern matches the same on the UTF-8 bytes as on the decoded text.
+
+    The ASCII characters never appear in the UTF-8 multibyte sequences, so a pattern that can only match
+    ASCII characters is safe, the character classes, the any character, the negated sets, the escapes
+    of letters or digits and the case folding can match non-ASCII characters.
+    """
+    if not pattern.pattern.isascii() or pattern.flags & re.IGNORECASE:
+        return False
+    return all(
+        _BYTES_SAFE_TOKEN_RE.fullmatch(token) is not None
+        for token in _PATTERN_TOKEN_RE.findall(pattern.pattern)
+    )
+
+
+def _get_bytes_patterns(
+    one_date_re: StrPattern,
+    two_date_re: StrPattern,
+) -> Optional[tuple[BytesPattern, BytesPattern]]:
+    """
+    Get the bytes version of the patterns, used to search the copyright without decoding the files.
+
+    Return None when a pattern can match differently on the UTF-8 bytes than on the text.
+    """
+    if not all(_is_bytes_safe(pattern) for pattern in (one_date_re, two_date_re)):
+        return None
+    try:
+        return (
+            re.compile(one_date_re.pattern.encode("utf-8"), one_date_re.flags & ~re.UNICODE),
+            re.compile(two_date_re.pattern.encode("utf-8"), two_date_re.flags & ~re.UNICODE),
+        )
+    except re.error:
+        return None
+
+
+def _is_up_to_date(
+    data: Union[bytes, mmap.mmap],
+    last_year: str,
+    one_date_re: BytesPattern,
+    two_date_re: BytesPattern,
+    first_year: Optional[str] = None,
+) -> Optional[bool]:
+    """
+    Check the copyright in the raw content, with the same rules as `update_file`.
+
+    Return None if no copyright is found.
+    """
+    two_date_match = two_date_re.search(data)
+    if two_date_match:
+        return (
+            two_date_match.group("from") != two_date_match.group("to")
+            and two_date_match.group("to") == last_year.encode()
+            and (first_year is None or two_date_match.group("from") == first_year.encode())
+        )
+    one_date_match = one_date_re.search(data)
+    if one_date_match:
+        return one_date_match.group("year") == last_year.encode() and (
+            first_year is None or one_date_match.group("year") == first_year.encode()
+        )
+    return None
+
+
+def _update_whole_file(
+    file_name: str,
+    last_year: str,
+    update: Callable[[str], tuple[bool, str]],
+    bytes_patterns: Optional[tuple[BytesPattern, BytesPattern]],
+    first_year: Optional[str] = None,
+) -> tuple[bool, bool]:
+    """
+    Update the copyright of the file, return the success and if the content changed.
+
+    The file is memory mapped and searched as bytes, it's only decoded when it should be updated.
+    """
+    with Path(file_name).open("rb") as file_obj:
+        size = os.fstat(file_obj.fileno()).st_size
+        data_context = (
+            mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ) if size else contextlib.nullcontext(b"")
+        )
+        with data_context as data:
+            if b"\0" in data[:_BINARY_CHECK_SIZE]:
+                raise _BinaryFileError
+            if bytes_patterns is not None:
+                up_to_date = _is_up_to_date(data, last_year, *bytes_patterns, first_year=first_year)
+                if up_to_date:
+                    return True, False
+                if up_to_date is None:
+                    # No copyright found, get the verdict without decoding the content
+                    return update("")[0], False
+            original_content = data[:].decode("utf-8")
+
+    file_success, content = update(original_content)
+    if not file_success:
+        with Path(file_name).open("wb") as file_obj:
+            file_obj.write(content.encode("utf-8"))
+    return file_success, content != original_content
+
+
+def _update_file_header(
+    file_name: str,
+    update: Callable[[str], tuple[bool, str]],
+    header_lines: Optional[int],
+    header_bytes: Optional[int],
+) -> tuple[bool, bool]:
+    """
+    Update the copyright in the header of the file, return the success and if the content changed.
+
+    Only the first `header_lines` lines and/or the first `header_bytes` bytes are read and updated,
+    the rest of the file is kept as is.
+    """
+    with Path(file_name).open("rb") as file_obj:
+        if header_lines is None:
+            header = file_obj.read(header_bytes)
+        else:
+            header = b"".join(file_obj.readline(header_bytes or -1) for _ in range(header_lines))
+            if header_bytes is not None and len(header) > header_bytes:
+                header = header[:header_bytes]
+                file_obj.seek(header_bytes)
+        at_end = not file_obj.read(1)
+
+    if b"\0" in header[:_BINARY_CHECK_SIZE]:
+        raise _BinaryFileError
+    if not at_end and not header.endswith(b"\n"):
+        # Don't cut a line
+        end_of_line = header.rfind(b"\n")
+        if end_of_line >= 0:
+            header = header[: end_of_line + 1]
+    # Remove the partial character at the end of the header
+    header_content = codecs.getincrementaldecoder("utf-8")().decode(header, final=at_end)
+    header = header_content.encode("utf-8")
+
+    file_success, new_header_content = update(header_content)
+    if new_header_content == header_content:
+        return file_success, False
+
+    new_header = new_header_content.encode("utf-8")
+    with Path(file_name).open("r+b") as file_obj:
+        if len(new_header) != len(header):
+            file_obj.seek(len(header))
+            rest = file_obj.read()
+            file_obj.seek(0)
+            file_obj.write(new_header)
+            file_obj.write(rest)
+            file_obj.truncate()
+        else:
+            file_obj.write(new_header)
+    return file_success, True
+
+
+def _get_git_state(git_cmd: str, file_name: str, license_file: str) -> _GitState:
+    """Get the Git state of a file, with one 'git status' and one 'git log' call."""
+    try:
+        with trace.span("git status", file=file_name):
+            status_str = subprocess.run(  # noqa: S603,RUF100
+                [git_cmd, "status", "--porcelain", "--", file_name],
+                check=True,
+                encoding="utf-8",
+                stdout=subprocess.PIPE,
+            ).stdout
+        if status_str:
+            return True, ""
+        if file_name == license_file:
+            with trace.span("git log", file=file_name):
+                date_str = subprocess.run(  # noqa: S603,S607,RUF100
+                    [git_cmd, "log", "--no-show-signature", "--pretty=format:%ci", "-1"],
                     check=True,
                     encoding="utf-8",
                     stdout=subprocess.PIPE,
                 ).stdout
-                if status_str:
-                    used_year = CURRENT_YEAR
-                    if args.verbose:
-                        print(f"File '{file_name}' is not committed.")
-                else:
-                    if file_name == license_file:
-                        date_str = subprocess.run(  # noqa: S603,S607,RUF100
-                            [git_cmd, "log", "--no-show-signature", "--pretty=format:%ci", "-1"],
-                            check=True,
-                            encoding="utf-8",
-                            stdout=subprocess.PIPE,
-                        ).stdout
-                    else:
-                        date_str = subprocess.run(  # noqa: S603,S607,RUF100
-                            [
-                                git_cmd,
-                                "log",
-                                "--no-show-signature",
-                                "--follow",
-                                "--pretty=format:%ci",
-                                "-1",
-                                "--",
-                                file_name,
-                            ],
-                            check=True,
-                            encoding="utf-8",
-                            stdout=subprocess.PIPE,
-                        ).stdout
-                    if not date_str:
-                        if args.verbose:
-                            print(f"No log found with git on '{file_name}'.")
-                        elif not no_git_log:
-                            print(
-                                f"No log found with git on '{file_name}' (the next messages will be hidden).",
-                            )
-                            no_git_log = True
-                        used_year = CURRENT_YEAR
-                    else:
-                        if args.verbose:
-                            print(f"File '{file_name}' was committed on '{date_str}'.")
-                        used_year_match = year_re.search(date_str)
-                        assert used_year_match is not None  # nosec
-                        used_year = used_year_match.group("year")
-            except subprocess.CalledProcessError as error:
-                print(f"Error with Git on '{file_name}' ({error!s}).")
-                used_year = CURRENT_YEAR
-
-        with Path(file_name).open(encoding="utf-8") as file_obj:
-            content = file_obj.read()
-            file_success, content = update_file(
-                content,
-                used_year,
-                one_date_re,
-                two_date_re,
-                one_date_format,
-                two_date_format,
-                file_name,
-                args.required,
-                args.verbose,
-            )
-        if not file_success:
-            success = False
-            with Path(file_name).open("w", encoding="utf-8") as file_obj:
-                file_obj.write(content)
-            if args.verbose:
-                print(f"Copyright updated in '{file_name}'.")
-
-    if not success:
-        sys.exit(1)
+        else:
+            with trace.span("git log", file=file_name):
+                date_str = subprocess.run(  # noqa: S603,S607,RUF100
+                    [
+                        git_cmd,
+                        "log",
+                        "--no-show-signature",
+                        "--follow",
+                        "--pretty=format:%ci",
+                        "-1",
+                        "--",
+                        file_name,
+                    ],
+                    check=True,
+                    encoding="utf-8",
+                    stdout=subprocess.PIPE,
+                ).stdout
+    except subprocess.CalledProcessError as error:
+        return error
+    return False, date_str
+
+
+def _get_git_states_batch(git_cmd: str, files: list[str], license_file: str) -> dict[str, _GitState]:
+    """
+    Get the Git state of all the files, with one 'git status' and one 'git log' call.
+
+    The log is streamed and stopped as soon as the last commit of every file is found.
+    """
+    try:
+        repository_index = index.get_index(git_cmd)
+        dirty_files = repository_index.dirty_files
+    except subprocess.CalledProcessError as error:
+        return dict.fromkeys(files, error)
+
+    states: dict[str, _GitState] = {}
+    # The paths relative to the repository root, as used by Git, to the file names
+    pending: dict[str, list[str]] = {}
+    license_pending = False
+    for file_name in files:
+        path = repository_index.get_path(file_name)
+        if path in dirty_files:
+            states[file_name] = True, ""
+        elif file_name == license_file:
+            license_pending = True
+        else:
+            pending.setdefault(path, []).append(file_name)
+
+    if pending or license_pending:
+        try:
+            with contextlib.closing(_iter_git_log(git_cmd)) as commits:
+                for date_str, paths in commits:
+                    if license_pending:
+                        # The license should be up to date with the last commit
+                        states[license_file] = False, date_str
+                        license_pending = False
+                    for path in paths:
+                        for file_name in pending.pop(path, []):
+                            states[file_name] = False, date_str
+                    if not pending and not license_pending:
+                        break
+        except subprocess.CalledProcessError as error:
+            for file_name in files:
+                states.setdefault(file_name, error)
+
+    for file_name in files:
+        states.setdefault(file_name, (False, ""))
+    return states
+
+
+def _get_git_states_history(
+    git_cmd: str,
+    files: list[str],
+    license_file: str,
+) -> tuple[dict[str, _GitState], dict[str, str]]:
+    """
+    Get the Git state and the first commit year of the files, with one 'git log' call.
+
+    The history is walked from the newest commit with the rename detection, the first commit that
+    touches a file gives its last commit date, and the commit that adds it, under its old name for
+    the renamed files, gives its first year. The walk stops when all the files are added.
+    """
+    try:
+        repository_index = index.get_index(git_cmd)
+        dirty_files = repository_index.dirty_files
+        shallow = repository_index.is_shallow
+    except subprocess.CalledProcessError as error:
+        return dict.fromkeys(files, error), {}
+    if shallow:
+        print("The repository is a shallow clone, the first years are not fixed.")
+
+    states: dict[str, _GitState] = {}
+    first_years: dict[str, str] = {}
+    # The paths of the files, at the current commit of the walk, to the file names
+    pending: dict[str, list[str]] = {}
+    license_pending = False
+    for file_name in files:
+        path = repository_index.get_path(file_name)
+        if path in dirty_files:
+            states[file_name] = True, ""
+        elif file_name == license_file:
+            license_pending = True
+        pending.setdefault(path, []).append(file_name)
+
+    try:
+        with contextlib.closing(_iter_git_log_status(git_cmd)) as commits:
+            for date_str, changes in commits:
+                if license_pending:
+                    # The license should be up to date with the last commit
+                    states[license_file] = False, date_str
+                    license_pending = False
+                for status, paths in changes:
+                    if status == "D":
+                        # The pending file is added after this deletion (not yet committed), a deletion
+                        # ends the history of the path, like with '--follow'
+                        pending.pop(paths[-1], None)
+                        continue
+                    file_names = pending.pop(paths[-1], None)
+                    if file_names is None:
+                        continue
+                    for file_name in file_names:
+                        states.setdefault(file_name, (False, date_str))
+                        first_years[file_name] = date_str[:4]
+                    if status in ("R", "C"):
+                        # Continue with the original file
+                        pending.setdefault(paths[0], []).extend(file_names)
+                    elif status != "A":
+                        pending[paths[-1]] = file_names
+                if not pending and not license_pending:
+                    break
+    except subprocess.CalledProcessError as error:
+        for file_name in files:
+            states.setdefault(file_name, error)
+        return states, {}
+
+    for file_name in files:
+        states.setdefault(file_name, (False, ""))
+    return states, {} if shallow else first_years
+
+
+def _get_cache_keys(git_cmd: str, files: list[str]) -> dict[str, str]:
+    """
+    Get the cache key of the committed and unmodified files.
+
+    The key is build from the path, the blob object id and the HEAD commit.
+    """
+    try:
+        repository_index = index.get_index(git_cmd)
+        head = repository_index.head
+        dirty_files = repository_index.dirty_files
+    except subprocess.CalledProcessError:
+        return {}
+
+    cache_keys = {}
+    for file_name in files:
+        info = repository_index.get_info(file_name)
+        if info is not None and info.path not in dirty_files:
+            cache_keys[file_name] = f"{info.path}:{info.object_id}:{head}"
+    return cache_keys
+
+
+def _iter_git_log_tokens(command: list[str]) -> Generator[bytes, None, None]:
+    """
+    Stream the NUL separated tokens of a 'git log -z' call.
+
+    The Git process is killed when the iterator is closed before the end of the history.
+    """
+    with (
+        trace.span("git log", args=command[2:]),
+        subprocess.Popen(command, stdout=subprocess.PIPE) as proc,  # noqa: S603,RUF100
+    ):
+        assert proc.stdout is not None  # nosec
+        try:
+            buffer = b""
+            while True:
+                chunk = proc.stdout.read(65536)
+                tokens = (buffer + chunk).split(b"\0")
+                buffer = tokens.pop() if chunk else b""
+                yield from tokens
+                if not chunk:
+                    break
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, command)
+
+
+def _iter_git_log(git_cmd: str, *args: str) -> Generator[tuple[str, list[str]], None, None]:
+    """Stream the commits from a 'git log --name-only' call, as (commit date, paths) tuples."""
+    command = [git_cmd, "log", "--no-show-signature", "--pretty=format:%x01%ci", "--name-only", "-z", *args]
+    with contextlib.closing(_iter_git_log_tokens(command)) as tokens:
+        date_str: Optional[str] = None
+        paths: list[str] = []
+        for token in tokens:
+            if token.startswith(b"\x01"):
+                if date_str is not None:
+                    yield date_str, paths
+                header, _, path = token[1:].partition(b"\n")
+                date_str = header.decode()
+                paths = [os.fsdecode(path)] if path else []
+            elif token:
+                paths.append(os.fsdecode(token))
+        if date_str is not None:
+            yield date_str, paths
+
+
+def _iter_git_log_status(git_cmd: str) -> Generator[tuple[str, list[tuple[str, list[str]]]], None, None]:
+    """
+    Stream the commits from a 'git log --name-status' call, with the rename and copy detection.
+
+    As (commit date, changes) tuples, the changes are (status letter, paths), with the original and
+    the new path for the renames and the copies.
+    """
+    command = [
+        git_cmd,
+        "log",
+        "--no-show-signature",
+        "--pretty=format:%x01%ci",
+        "--name-status",
+        "--find-renames",
+        "--find-copies",
+        "-z",
+    ]
+    with contextlib.closing(_iter_git_log_tokens(command)) as tokens:
+        date_str: Optional[str] = None
+        changes: list[tuple[str, list[str]]] = []
+        # The change being read, and its number of paths
+        status = ""
+        paths: list[str] = []
+        for token in tokens:
+            if token.startswith(b"\x01"):
+                if date_str is not None:
+                    yield date_str, changes
+                header, _, status_bytes = token[1:].partition(b"\n")
+                date_str = header.decode()
+                changes = []
+                status = status_bytes.decode()[:1]
+                paths = []
+            elif not token:
+                continue
+            elif not status:
+                # The status is followed by a score for the renames and the copies
+                status = token.decode()[:1]
+            else:
+                paths.append(os.fsdecode(token))
+                if len(paths) == (2 if status in ("R", "C") else 1):
+                    changes.append((status, paths))
+                    status = ""
+                    paths = []
+        if date_str is not None:
+            yield date_str, changes
+
+
+def _get_used_years(
+    files: list[str],
+    states: dict[str, _GitState],
+    verbose: bool,
+    current_year: Optional[str] = None,
+) -> dict[str, str]:
+    """Get the year to be used in the copyright of each file, from its Git state."""
+    current_year = current_year or get_current_year()
+    used_years = {}
+    no_git_log = False
+    for file_name in files:
+        state = states[file_name]
+        if isinstance(state, subprocess.CalledProcessError):
+            print(f"Error with Git on '{file_name}' ({state!s}).")
+            used_years[file_name] = current_year
+            continue
+        dirty, date_str = state
+        if dirty:
+            used_years[file_name] = current_year
+            if verbose:
+                print(f"File '{file_name}' is not committed.")
+        elif not date_str:
+            if verbose:
+                print(f"No log found with git on '{file_name}'.")
+            elif not no_git_log:
+                print(
+                    f"No log found with git on '{file_name}' (the next messages will be hidden).",
+                )
+                no_git_log = True
+            used_years[file_name] = current_year
+        else:
+            if verbose:
+                print(f"File '{file_name}' was committed on '{date_str}'.")
+            used_year_match = _YEAR_RE.search(date_str)
+            assert used_year_match is not None  # nosec
+            used_years[file_name] = used_year_match.group("year")
+    return used_years
 
 
 def update_file(
@@ -143,11 +815,23 @@ def update_file(
     filename: str = "<unknown>",
     required: bool = False,
     verbose: bool = False,
-    current_year: str = CURRENT_YEAR,
+    current_year: Optional[str] = None,
+    print_function: Callable[[str], None] = print,
+    first_year: Optional[str] = None,
 ) -> tuple[bool, str]:
-    """Update the copyright header of the file content."""
+    """
+    Update the copyright header of the file content.
+
+    With the first year (of the Git history), the from year of the copyright is also fixed.
+    """
+    current_year = current_year or get_current_year()
     two_date_match = two_date_re.search(content)
     if two_date_match:
+        if first_year is not None and two_date_match.group("from") != first_year:
+            return False, two_date_re.sub(
+                _format_years(first_year, current_year, one_date_format, two_date_format),
+                content,
+            )
         if two_date_match.group("from") == two_date_match.group("to"):
             if two_date_match.group("from") == current_year:
                 return False, two_date_re.sub(one_date_format.format(year=current_year), content)
@@ -171,6 +855,12 @@ def update_file(
     if one_date_match:
         copyright_year = one_date_match.group("year")
 
+        if first_year is not None and copyright_year != first_year:
+            return False, one_date_re.sub(
+                _format_years(first_year, current_year, one_date_format, two_date_format),
+                content,
+            )
+
         if copyright_year == last_year:
             return True, content
 
@@ -180,9 +870,16 @@ def update_file(
         )
 
     if required or verbose:
-        print(f"No copyright found on '{filename}'.")
+        print_function(f"No copyright found on '{filename}'.")
     return not required, content
 
 
+def _format_years(from_year: str, to_year: str, one_date_format: str, two_date_format: str) -> str:
+    """Format the copyright with one year when both are the same."""
+    if from_year == to_year:
+        return one_date_format.format(year=to_year)
+    return two_date_format.format(**{"from": from_year, "to": to_year})
+
+
 if __name__ == "__main__":
     main()
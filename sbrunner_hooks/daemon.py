@@ -0,0 +1,133 @@
+# Copyright (c) 2026, Stéphane Brunner
+"""
+A local daemon, to run the hooks in a warm process, with a thin client over a Unix domain socket.
+
+Only available on the platforms with the Unix domain sockets.
+
+The messages are JSON objects, one per connection, the request is terminated by the end of the writing
+side of the client, the response by the close of the connection.
+"""
+
+import fcntl
+import json
+import os
+import socket
+import socketserver
+import stat
+import tempfile
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any, Optional
+
+# Incremented on incompatible changes, the client falls back on the in-process execution
+PROTOCOL_VERSION = 1
+# Stop the daemon after 10 minutes without request
+DEFAULT_IDLE_TIMEOUT = 600
+# The client falls back on the in-process execution when the daemon doesn't respond in 2 minutes
+DEFAULT_REQUEST_TIMEOUT = 120
+
+
+def get_socket_path() -> Path:
+    """Get the path of the socket, in a directory only accessible by the current user."""
+    return Path(tempfile.gettempdir()) / f"sbrunner-hooks-{os.getuid()}" / "daemon.sock"
+
+
+def request(
+    message: dict[str, Any],
+    socket_path: Optional[Path] = None,
+    timeout: float = DEFAULT_REQUEST_TIMEOUT,
+) -> Optional[dict[str, Any]]:
+    """
+    Send a request to the daemon and get the response.
+
+    None when no compatible daemon is running, or when it doesn't respond before the timeout (in seconds).
+    """
+    socket_path = socket_path or get_socket_path()
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(timeout)
+            client.connect(str(socket_path))
+            client.sendall(json.dumps({"version": PROTOCOL_VERSION, **message}).encode())
+            client.shutdown(socket.SHUT_WR)
+            data = b"".join(iter(lambda: client.recv(65536), b""))
+        response = json.loads(data)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(response, dict) or "error" in response:
+        return None
+    return response
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    server: "_Server"
+
+    def handle(self) -> None:
+        try:
+            message = json.loads(self.rfile.read())
+        except ValueError:
+            return
+        if not isinstance(message, dict) or message.get("version") != PROTOCOL_VERSION:
+            response: dict[str, Any] = {"error": f"Unsupported protocol version, expected {PROTOCOL_VERSION}"}
+        elif message.get("command") == "ping":
+            response = {"pid": os.getpid()}
+        elif message.get("command") == "stop":
+            self.server.stopped = True
+            response = {"pid": os.getpid()}
+        else:
+            try:
+                response = self.server.handle_message(message)
+            except Exception as error:  # noqa: BLE001 # pylint: disable=broad-exception-caught
+                response = {"error": str(error)}
+        self.wfile.write(json.dumps(response).encode())
+
+
+class _Server(socketserver.UnixStreamServer):
+    """Handle the requests one by one, and stop after the idle timeout."""
+
+    def __init__(
+        self,
+        socket_path: Path,
+        handle_message: Callable[[dict[str, Any]], dict[str, Any]],
+        idle_timeout: float,
+    ) -> None:
+        self.handle_message = handle_message
+        self.timeout = idle_timeout
+        self.stopped = False
+        super().__init__(str(socket_path), _RequestHandler)
+
+    def handle_timeout(self) -> None:
+        self.stopped = True
+
+
+def serve(
+    handle_message: Callable[[dict[str, Any]], dict[str, Any]],
+    idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+    socket_path: Optional[Path] = None,
+) -> bool:
+    """
+    Serve the requests until the stop request or the idle timeout.
+
+    Return False if another daemon is already running.
+    """
+    socket_path = socket_path or get_socket_path()
+    socket_path.parent.mkdir(mode=0o700, exist_ok=True)
+    directory_stat = socket_path.parent.stat()
+    if directory_stat.st_uid != os.getuid() or stat.S_IMODE(directory_stat.st_mode) & 0o077:
+        message = f"The directory '{socket_path.parent}' should be only accessible by the current user"
+        raise PermissionError(message)
+    # The lock is held while the daemon is running, to have only one daemon per socket
+    with (socket_path.parent / "daemon.lock").open("w", encoding="utf-8") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        # Socket of a killed daemon
+        socket_path.unlink(missing_ok=True)
+        server = _Server(socket_path, handle_message, idle_timeout)
+        try:
+            while not server.stopped:
+                server.handle_request()
+        finally:
+            server.server_close()
+            socket_path.unlink(missing_ok=True)
+    return True
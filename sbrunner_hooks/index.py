@@ -0,0 +1,177 @@
+# Copyright (c) 2026, Stéphane Brunner
+"""The files of the Git repository, listed once and shared by the hooks."""
+
+import os
+import posixpath
+import re
+import subprocess  # nosec
+from collections.abc import Collection
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from sbrunner_hooks import trace
+
+# The kind of the files, from their path relative to the repository root,
+# the first matching group gives the kind
+_CLASSIFIER_RE = re.compile(
+    r"""(?x)^(?:
+      (?P<workflow>\.github/workflows/[^/]+\.ya?ml)
+      |(?P<prospector>(?:.*/)?\.?prospector(?:\.ya?ml|-[^/]*)|prospector_[^/]*/[^/]+)
+      |(?P<pyproject>(?:.*/)?pyproject\.toml)
+      |(?P<pre_commit>(?:.*/)?\.pre-commit-config\.ya?ml)
+    )$""",
+)
+
+
+def classify(path: str) -> Optional[str]:
+    """
+    Get the kind of a file from its path relative to the repository root.
+
+    The kinds are 'workflow', 'prospector', 'pyproject' and 'pre-commit', or None.
+    """
+    match = _CLASSIFIER_RE.match(path)
+    if match is None or match.lastgroup is None:
+        return None
+    return match.lastgroup.replace("_", "-")
+
+
+class FileInfo(NamedTuple):
+    """The information of a tracked file, from the Git index."""
+
+    path: str
+    """The path relative to the repository root."""
+    mode: str
+    object_id: str
+    kind: Optional[str]
+
+
+class RepositoryIndex:
+    """
+    The tracked files of the current directory, with their metadata.
+
+    The files are listed with one 'git ls-files' call, the modified files with one 'git status' call,
+    and the sizes are read on demand, everything is cached.
+    """
+
+    def __init__(self, git_cmd: str) -> None:
+        self.git_cmd = git_cmd
+        # The path of the current directory relative to the repository root
+        self.prefix = self._run("rev-parse", "--show-prefix").decode().strip()
+        self._entries: dict[str, FileInfo] = {}
+        for entry in self._run("ls-files", "--stage", "--full-name", "-z").split(b"\0"):
+            if entry:
+                # <mode> SP <object> SP <stage> TAB <file>
+                info, _, entry_path = entry.partition(b"\t")
+                mode, object_id, _ = info.decode().split(" ")
+                path = os.fsdecode(entry_path)
+                self._entries[path] = FileInfo(path, mode, object_id, classify(path))
+        self._head: Optional[str] = None
+        self._shallow: Optional[bool] = None
+        self._dirty_files: Optional[set[str]] = None
+        self._sizes: dict[str, int] = {}
+
+    def _run(self, *args: str) -> bytes:
+        with trace.span(f"git {args[0]}", args=list(args)):
+            return subprocess.run(  # noqa: S603,RUF100
+                [self.git_cmd, *args],
+                check=True,
+                stdout=subprocess.PIPE,
+            ).stdout
+
+    def get_path(self, file_name: str) -> str:
+        """Get the path of the file relative to the repository root, as used by Git."""
+        return posixpath.normpath(self.prefix + Path(os.path.relpath(file_name)).as_posix())
+
+    def files(self, kinds: Optional[Collection[str]] = None) -> list[str]:
+        """
+        Get the tracked regular files, relative to the current directory.
+
+        The deleted files and the symbolic links are skipped, the files can be filtered by kind.
+        """
+        return [
+            file_name
+            for file_name in (
+                info.path[len(self.prefix) :]
+                for info in self._entries.values()
+                if kinds is None or info.kind in kinds
+            )
+            if Path(file_name).is_file() and not Path(file_name).is_symlink()
+        ]
+
+    def get_info(self, file_name: str) -> Optional[FileInfo]:
+        """Get the Git information of the file, None if it's not tracked."""
+        return self._entries.get(self.get_path(file_name))
+
+    @property
+    def head(self) -> str:
+        """The HEAD commit."""
+        if self._head is None:
+            self._head = self._run("rev-parse", "--verify", "--quiet", "HEAD").decode().strip()
+        return self._head
+
+    @property
+    def is_shallow(self) -> bool:
+        """The repository is a shallow clone, the history is incomplete."""
+        if self._shallow is None:
+            self._shallow = self._run("rev-parse", "--is-shallow-repository").decode().strip() == "true"
+        return self._shallow
+
+    @property
+    def dirty_files(self) -> set[str]:
+        """The modified and the untracked files, relative to the repository root."""
+        if self._dirty_files is None:
+            status = self._run("status", "--porcelain", "-z", "--untracked-files=all")
+            dirty_files = set()
+            entries = iter(status.split(b"\0"))
+            for entry in entries:
+                if not entry:
+                    continue
+                dirty_files.add(os.fsdecode(entry[3:]))
+                if entry[0:1] in (b"R", b"C"):
+                    # Skip the original path of the rename or copy
+                    next(entries, None)
+            self._dirty_files = dirty_files
+        return self._dirty_files
+
+    def is_dirty(self, file_name: str) -> bool:
+        """Check if the file is modified or untracked."""
+        return self.get_path(file_name) in self.dirty_files
+
+    def get_size(self, file_name: str) -> int:
+        """Get the size of the file in the working tree."""
+        path = self.get_path(file_name)
+        if path not in self._sizes:
+            self._sizes[path] = Path(file_name).lstat().st_size
+        return self._sizes[path]
+
+    def refresh(self) -> None:
+        """Forget the state of the working tree, e.g. after a hook that modifies the files."""
+        self._head = None
+        self._dirty_files = None
+        self._sizes = {}
+
+
+_INDEXES: dict[tuple[str, str], RepositoryIndex] = {}
+
+
+def get_index(git_cmd: str) -> RepositoryIndex:
+    """
+    Get the index of the current directory, shared by the hooks running in the same process.
+
+    Raise a `subprocess.CalledProcessError` when we are not in a Git repository.
+    """
+    key = (git_cmd, str(Path.cwd()))
+    if key not in _INDEXES:
+        _INDEXES[key] = RepositoryIndex(git_cmd)
+    return _INDEXES[key]
+
+
+def refresh() -> None:
+    """Forget the state of the working tree in all the indexes."""
+    for index in _INDEXES.values():
+        index.refresh()
+
+
+def clear() -> None:
+    """Forget all the indexes, e.g. when the files can be added or removed."""
+    _INDEXES.clear()
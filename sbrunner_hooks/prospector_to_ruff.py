@@ -3,10 +3,140 @@
 # Get the Ruff configuration from the prospector.yaml and put it in the pyproject.toml
 
 import argparse
+import contextlib
+import copy
+import importlib.metadata
+import importlib.util
+import json
+import os
+import threading
+from collections.abc import Generator
 from pathlib import Path
+from typing import TYPE_CHECKING, Any, Optional, Union
 
-import prospector.profiles.profile
-import tomlkit
+from sbrunner_hooks import trace
+from sbrunner_hooks.cache import JsonCache, get_cache_dir, hash_inputs
+
+# Prospector and tomlkit are imported in the functions that use them, to keep the startup fast
+if TYPE_CHECKING:
+    import prospector.profiles.profile
+
+# The `_load_content` function of prospector is replaced during the loads, one load at a time
+_PATCH_LOCK = threading.Lock()
+
+
+class _ProfileLoader:
+    """
+    Load the prospector profiles, with a cache of the profile contents.
+
+    The contents are keyed by the profile name and the search path, then by the candidate files with
+    their modification time and size, so the shared parent profiles are read only once for all the
+    prospector configurations. The contents of the profile files can also be stored in a `JsonCache`.
+    """
+
+    def __init__(self, cache: Optional[JsonCache] = None) -> None:
+        self.cache = cache
+        self._files: dict[tuple[str, tuple[str, ...]], list[str]] = {}
+        self._contents: dict[str, dict[str, Any]] = {}
+
+    def load(
+        self,
+        name_or_path: Union[str, Path],
+        profile_path: list[Path],
+    ) -> "prospector.profiles.profile.ProspectorProfile":
+        """Load the profile and the inherited profiles."""
+        import prospector.profiles.profile  # noqa: PLC0415 # pylint: disable=import-outside-toplevel
+
+        with (
+            trace.span("ProspectorProfile.load", profile=str(name_or_path)),
+            _PATCH_LOCK,
+            self._patch_load_content(),
+        ):
+            return prospector.profiles.profile.ProspectorProfile.load(name_or_path, profile_path)
+
+    @contextlib.contextmanager
+    def _patch_load_content(self) -> Generator[None, None, None]:
+        """Use our cached `_load_content` in prospector, used for the profile and all the inherited ones."""
+        import prospector.profiles.profile  # noqa: PLC0415 # pylint: disable=import-outside-toplevel
+
+        original_load_content = getattr(prospector.profiles.profile, "_load_content", None)
+        if original_load_content is None:
+            # Not supported by this version of prospector, load without cache
+            yield
+            return
+
+        def load_content(name_or_path: Union[str, Path], profile_path: list[Path]) -> dict[str, Any]:
+            key = self._get_key(name_or_path, profile_path)
+            if key is None:
+                return original_load_content(name_or_path, profile_path)  # type: ignore[no-any-return]
+            if key not in self._contents:
+                content = self.cache.get(key) if self.cache is not None else None
+                if content is None:
+                    content = original_load_content(name_or_path, profile_path)
+                    # Only store the contents that are not changed by the JSON serialization
+                    if self.cache is not None and json.loads(json.dumps(content)) == content:
+                        self.cache.set(key, content)
+                self._contents[key] = content
+            # The content is modified by prospector
+            return copy.deepcopy(self._contents[key])
+
+        prospector.profiles.profile._load_content = load_content  # noqa: SLF001 # pylint: disable=protected-access
+        try:
+            yield
+        finally:
+            prospector.profiles.profile._load_content = original_load_content  # noqa: SLF001 # pylint: disable=protected-access
+
+    def _get_key(self, name_or_path: Union[str, Path], profile_path: list[Path]) -> Optional[str]:
+        """Get the cache key of the profile files, None for the profiles not found."""
+        files_key = (str(name_or_path), tuple(str(path) for path in profile_path))
+        if files_key not in self._files:
+            self._files[files_key] = _find_profile_files(name_or_path, profile_path)
+        file_names = self._files[files_key]
+        if not file_names:
+            return None
+        keys = []
+        for file_name in file_names:
+            stat = Path(file_name).stat()
+            keys.append(f"{Path(file_name).absolute()}:{stat.st_mtime_ns}:{stat.st_size}")
+        return "|".join(keys)
+
+
+def _find_profile_files(name_or_path: Union[str, Path], profile_path: list[Path]) -> list[str]:
+    """
+    Find the candidate files of the profile, in the profile path or in a profile package.
+
+    All the existing files of the profile path are returned in the search order, to get a key that covers
+    the file used by prospector, whatever its precedence (the last one for the names without extension).
+    """
+    name = str(name_or_path).removesuffix("?")
+    file_names = [name] if os.path.splitext(name)[1] in (".yml", ".yaml") else [f"{name}.yml", f"{name}.yaml"]  # noqa: PTH122
+    found = [
+        file_path
+        for path in profile_path
+        for file_path in (os.path.join(path, file_name) for file_name in file_names)  # noqa: PTH118
+        if os.path.exists(file_path)  # noqa: PTH110
+    ]
+    if found:
+        return found
+
+    # e.g. 'utils:base' is the file 'base.yaml' of the 'prospector_profile_utils' package
+    name_split = name.split(":", 1)
+    try:
+        spec = importlib.util.find_spec(f"prospector_profile_{name_split[0]}")
+    except (ImportError, ValueError):
+        return []
+    if spec is None or spec.origin is None:
+        return []
+    package_file_names = (
+        ["prospector.yaml", "prospector.yml"]
+        if len(name_split) == 1
+        else [f"{name_split[1]}.yaml", f"{name_split[1]}.yml"]
+    )
+    for file_name in package_file_names:
+        file_path = os.path.join(os.path.dirname(spec.origin), file_name)  # noqa: PTH118,PTH120
+        if os.path.exists(file_path):  # noqa: PTH110
+            return [file_path]
+    return []
 
 
 def main() -> None:
@@ -25,8 +155,36 @@ def main() -> None:
         nargs="+",
         help="Path to the prospector.yaml file containing the Ruff configuration",
     )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Cache the content of the profile files, keyed by the path, the modification time and the size",
+    )
+    trace.add_argument(parser)
 
     args = parser.parse_args()
+    trace.setup(args.trace)
+
+    cache = (
+        JsonCache(
+            get_cache_dir() / "prospector-profiles.json",
+            hash_inputs(importlib.metadata.version("prospector")),
+        )
+        if args.cache
+        else None
+    )
+    loader = _ProfileLoader(cache)
+    try:
+        _process_configs(args, loader)
+    finally:
+        if cache is not None:
+            cache.save()
+
+
+def _process_configs(args: argparse.Namespace, loader: _ProfileLoader) -> None:
+    """Update the pyproject.toml files of the prospector configurations."""
+    import prospector.profiles.profile  # noqa: PLC0415 # pylint: disable=import-outside-toplevel
+    import tomlkit  # noqa: PLC0415 # pylint: disable=import-outside-toplevel
 
     for prospector_config in args.prospector_config:
         if not prospector_config.is_file():
@@ -47,9 +205,12 @@ def main() -> None:
 
         print(f"Using profile path: {', '.join(str(p) for p in profile_path)}")
 
-        profile = prospector.profiles.profile.ProspectorProfile.load(prospector_config.name, profile_path)
+        profile = loader.load(prospector_config.name, profile_path)
 
-        with pyproject_path.open("r", encoding="utf-8") as pyproject_file:
+        with (
+            trace.span("tomlkit.parse", file=str(pyproject_path)),
+            pyproject_path.open("r", encoding="utf-8") as pyproject_file,
+        ):
             pyproject_doc = tomlkit.parse(pyproject_file.read())
         ruff_config = pyproject_doc.setdefault("tool", {}).setdefault("ruff", {})
         lint_config = ruff_config.setdefault("lint", {})
@@ -96,7 +257,7 @@ def main() -> None:
                 current_config[option] = value
 
         if args.test:
-            test_profile = prospector.profiles.profile.ProspectorProfile.load(args.test, profile_path)
+            test_profile = loader.load(args.test, profile_path)
             test_ignores = test_profile.ruff.get("disable", [])  # pylint: disable=no-member
             if test_ignores:
                 test_ignores = sorted(test_ignores)
@@ -112,7 +273,10 @@ def main() -> None:
                     ):
                         lint_config["extend-per-file-ignores"][file_pattern] = test_ignores
 
-        with pyproject_path.open("w", encoding="utf-8") as pyproject_file:
+        with (
+            trace.span("tomlkit.dump", file=str(pyproject_path)),
+            pyproject_path.open("w", encoding="utf-8") as pyproject_file,
+        ):
             tomlkit.dump(pyproject_doc, pyproject_file)
 
 
@@ -0,0 +1,352 @@
+# Copyright (c) 2026, Stéphane Brunner
+"""Run several hooks in one process, to pay the interpreter start and the imports only once."""
+
+import argparse
+import contextlib
+import importlib
+import io
+import os
+import re
+import shlex
+import shutil
+import socket
+import subprocess  # nosec
+import sys
+import traceback
+from pathlib import Path
+from types import ModuleType
+from typing import Any, NamedTuple, Optional
+
+from sbrunner_hooks import index, trace
+
+
+class _Hook(NamedTuple):
+    """
+    A hook that can be run in process, like defined in the `.pre-commit-hooks.yaml` file.
+
+    The arguments and the files filter are checked against this file by the tests.
+    """
+
+    module: str
+    args: list[str]
+    files: Optional[re.Pattern[str]]
+
+
+_HOOKS = {
+    "copyright": _Hook("sbrunner_hooks.copyright", [], None),
+    "copyright-required": _Hook("sbrunner_hooks.copyright", ["--required"], None),
+    "workflows-require-timeout": _Hook(
+        "sbrunner_hooks.workflow_timeout",
+        [],
+        re.compile(r"^\.github/workflows/.+\.ya?ml$"),
+    ),
+    "prospector-to-ruff": _Hook(
+        "sbrunner_hooks.prospector_to_ruff",
+        [],
+        re.compile(r"^(|.*/)(\.?prospector(-.*)?\.ya?ml)$"),
+    ),
+    "canonicalize": _Hook(
+        "sbrunner_hooks.canonicalize",
+        [],
+        re.compile(
+            r"""(?x)^(
+              \.github/workflows/[^/]+\.ya?ml
+              |(|.*/)\.?prospector(-.*)?\.ya?ml
+              |(|.*/)pyproject\.toml
+              |(|.*/).pre-commit-config\.ya?ml
+            )$""",
+        ),
+    ),
+}
+
+# The hooks that only depend on the content of the files given as arguments, with the arguments that make
+# them depend on other files (e.g. the files tracked by Git)
+_CONTENT_ONLY_HOOKS = {
+    "workflows-require-timeout": {"--all"},
+    "canonicalize": {"--all", "--optimize-exclude"},
+}
+
+# The state of the files that passed the content only hooks, in the daemon
+_MEMO: dict[tuple[str, str], tuple[int, int, int]] = {}
+
+
+def _parse_hook(spec: str) -> tuple[str, list[str]]:
+    """Get the name and the additional arguments of a hook given as `<name>[:<arguments>]`."""
+    name, _, arguments = spec.partition(":")
+    return name, shlex.split(arguments)
+
+
+def _check_hook(spec: str) -> str:
+    """Check the hook given on the command line."""
+    name = spec.partition(":")[0]
+    if name not in _HOOKS:
+        message = f"invalid hook: '{name}' (choose from {', '.join(_HOOKS)})"
+        raise argparse.ArgumentTypeError(message)
+    try:
+        _parse_hook(spec)
+    except ValueError as error:
+        message = f"invalid arguments of the hook '{name}': {error!s}"
+        raise argparse.ArgumentTypeError(message) from error
+    return spec
+
+
+def _is_content_only(spec: str) -> bool:
+    """Check that the result of the hook only depends on the content of the given files."""
+    name, arguments = _parse_hook(spec)
+    other_files_arguments = _CONTENT_ONLY_HOOKS.get(name)
+    return other_files_arguments is not None and not other_files_arguments.intersection(arguments)
+
+
+def _run_hook(spec: str, files: list[str]) -> int:
+    """Run the main of the hook with its arguments and the files, and get the exit code."""
+    name, arguments = _parse_hook(spec)
+    hook = _HOOKS[name]
+    with trace.span(f"import {hook.module}"):
+        module = importlib.import_module(hook.module)
+    original_argv = sys.argv
+    sys.argv = [name, *hook.args, *arguments, *files]
+    try:
+        with trace.span(spec, files=len(files)):
+            module.main()
+    except SystemExit as exit_:
+        if exit_.code is None:
+            return 0
+        if isinstance(exit_.code, int):
+            return exit_.code
+        print(exit_.code)
+        return 1
+    except Exception:  # noqa: BLE001 # pylint: disable=broad-exception-caught
+        traceback.print_exc()
+        return 1
+    finally:
+        sys.argv = original_argv
+    return 0
+
+
+def _get_stat(file_name: str) -> Optional[tuple[int, int, int]]:
+    try:
+        file_stat = Path(file_name).stat()
+    except OSError:
+        return None
+    return file_stat.st_mtime_ns, file_stat.st_size, file_stat.st_ino
+
+
+def _run_hooks(
+    hooks: list[str],
+    files: list[str],
+    memo: Optional[dict[tuple[str, str], tuple[int, int, int]]] = None,
+) -> list[tuple[str, Optional[int]]]:
+    """
+    Run the hooks on the files that match their files filter, and get the exit codes, None for skipped.
+
+    With the memo, the content only hooks are not run again on the files unchanged since they passed.
+    """
+    results: list[tuple[str, Optional[int]]] = []
+    for spec in hooks:
+        name = spec.partition(":")[0]
+        files_re = _HOOKS[name].files
+        hook_files = [file_name for file_name in files if files_re is None or files_re.match(file_name)]
+        if not hook_files:
+            # Like pre-commit, the hooks without files are skipped
+            results.append((spec, None))
+            continue
+        paths: list[str] = []
+        if memo is not None and _is_content_only(spec):
+            paths = [str(Path(file_name).absolute()) for file_name in hook_files]
+            hook_files = [
+                file_name
+                for file_name, path in zip(hook_files, paths, strict=True)
+                if (file_stat := _get_stat(file_name)) is None or memo.get((spec, path)) != file_stat
+            ]
+        returncode = _run_hook(spec, hook_files) if hook_files else 0
+        results.append((spec, returncode))
+        if memo is not None and returncode == 0:
+            for path in paths:
+                # Get the state after the run, the hook can modify the files
+                file_stat = _get_stat(path)
+                if file_stat is not None:
+                    memo[(spec, path)] = file_stat
+        # The listed files are shared, but the hooks can modify them
+        index.refresh()
+    return results
+
+
+def _run(
+    hooks: list[str],
+    files: list[str],
+    all_files: bool,
+    memo: Optional[dict[tuple[str, str], tuple[int, int, int]]] = None,
+) -> None:
+    """Run the hooks, print the results, and exit with an error if a hook failed."""
+    if all_files:
+        git_cmd = shutil.which("git")
+        if git_cmd is None:
+            print("Git is required with --all")
+            sys.exit(1)
+        try:
+            files = [*files, *index.get_index(git_cmd).files()]
+        except subprocess.CalledProcessError as error:
+            print(f"Error while listing the files with Git ({error!s}).")
+            sys.exit(1)
+
+    results = _run_hooks(hooks, files, memo)
+
+    for name, returncode in results:
+        if returncode is None:
+            print(f"{name}: Skipped (no files to check)")
+        elif returncode == 0:
+            print(f"{name}: Passed")
+        else:
+            print(f"{name}: Failed (exit code {returncode})")
+
+    if any(returncode for _, returncode in results):
+        sys.exit(1)
+
+
+def _handle_daemon_request(message: dict[str, Any]) -> dict[str, Any]:
+    """Run the hooks in the directory of the client, and get the output and the exit code."""
+    if message.get("command") != "run":
+        return {"error": f"Unknown command '{message.get('command')}'"}
+    if message.get("python") != sys.executable or message.get("module") != __file__:
+        # Not the same environment, the client should run the hooks itself
+        return {"error": "The daemon is running with another installation"}
+    original_cwd = Path.cwd()
+    output = io.StringIO()
+    returncode = 0
+    try:
+        os.chdir(message["cwd"])
+        # The working tree can be modified between the requests
+        index.clear()
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            try:
+                _run(message["hooks"], message["files"], message["all"], _MEMO)
+            except SystemExit as exit_:
+                returncode = exit_.code if isinstance(exit_.code, int) else 1
+    finally:
+        os.chdir(original_cwd)
+        # Enabled by the arguments of a hook, the events should not accumulate in the daemon
+        trace.flush()
+    return {"output": output.getvalue(), "returncode": returncode}
+
+
+def _get_daemon() -> Optional[ModuleType]:
+    """Get the daemon module, None when the Unix domain sockets are not supported."""
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    from sbrunner_hooks import daemon  # noqa: PLC0415 # pylint: disable=import-outside-toplevel
+
+    return daemon
+
+
+def _start_daemon(idle_timeout: Optional[float] = None) -> None:
+    """Start the daemon in the background, detached from the current process."""
+    command = [sys.executable, "-m", "sbrunner_hooks.run_hooks", "daemon"]
+    if idle_timeout is not None:
+        command += ["--idle-timeout", str(idle_timeout)]
+    subprocess.Popen(  # noqa: S603 # pylint: disable=consider-using-with
+        command,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def main() -> None:
+    """Run several hooks in one process."""
+    argv = sys.argv[1:]
+    files: list[str] = []
+    if "--" in argv:
+        files = argv[argv.index("--") + 1 :]
+        argv = argv[: argv.index("--")]
+
+    parser = argparse.ArgumentParser(
+        prog="sbrunner-hooks",
+        description="""Run several hooks in one process.
+
+    Example:
+    sbrunner-hooks run copyright:--batch workflows-require-timeout canonicalize -- file1 dir/file2
+
+    Each hook gets the files that match its files filter, the exit status of each hook is reported.
+    The arguments of a hook are given after a colon, split like in a shell.
+    """,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="Run the hooks on the files given after '--'")
+    run_parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Run the hooks on all the files tracked by Git, without using pre-commit",
+    )
+    run_parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Run the hooks in the daemon if it's running, in the current process otherwise",
+    )
+    run_parser.add_argument(
+        "--start-daemon",
+        action="store_true",
+        help="Like --daemon, and start the daemon in the background if it's not running",
+    )
+    trace.add_argument(run_parser)
+    run_parser.add_argument(
+        "hooks",
+        nargs="+",
+        type=_check_hook,
+        metavar="HOOK[:ARGUMENTS]",
+        help=f"The hooks to run, with their additional arguments, the hooks are: {', '.join(_HOOKS)}",
+    )
+    daemon_parser = subparsers.add_parser(
+        "daemon",
+        help="Run the daemon, that keeps the imports warm for 'run --daemon'",
+    )
+    daemon_parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        help="Stop the daemon after this number of seconds without request (default: 600)",
+    )
+    daemon_parser.add_argument("--stop", action="store_true", help="Stop the running daemon")
+    args = parser.parse_args(argv)
+
+    daemon = _get_daemon()
+    if args.command == "daemon":
+        if daemon is None:
+            print("The daemon requires the Unix domain sockets")
+            sys.exit(1)
+        if args.stop:
+            if daemon.request({"command": "stop"}) is None:
+                print("The daemon is not running")
+            return
+        idle_timeout = daemon.DEFAULT_IDLE_TIMEOUT if args.idle_timeout is None else args.idle_timeout
+        # The clients that record a trace don't use the daemon
+        os.environ.pop(trace.ENVIRONMENT_VARIABLE, None)
+        if not daemon.serve(_handle_daemon_request, idle_timeout):
+            print("The daemon is already running")
+        return
+
+    trace.setup(args.trace)
+    # The daemon doesn't record the traces
+    if (args.daemon or args.start_daemon) and daemon is not None and not trace.is_enabled():
+        response = daemon.request(
+            {
+                "command": "run",
+                "python": sys.executable,
+                "module": __file__,
+                "cwd": str(Path.cwd()),
+                "hooks": args.hooks,
+                "files": files,
+                "all": args.all,
+            },
+        )
+        if response is not None:
+            print(response["output"], end="")
+            sys.exit(response["returncode"])
+        if args.start_daemon:
+            _start_daemon()
+
+    _run(args.hooks, files, args.all)
+
+
+if __name__ == "__main__":
+    main()
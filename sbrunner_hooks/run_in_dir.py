@@ -1,9 +1,246 @@
 """Run a command in files folder."""
 
 import argparse
+import concurrent.futures
+import contextlib
+import hashlib
+import json
+import os
+import shlex
+import signal
 import subprocess  # nosec
 import sys
+import threading
+import time
 from pathlib import Path
+from typing import Any, Optional
+
+from sbrunner_hooks import positive_int, trace
+from sbrunner_hooks.cache import JsonCache, get_cache_dir, hash_inputs
+
+# The lock file produced from the input file, used in the stamp
+_LOCK_FILES = {
+    "pyproject.toml": "poetry.lock",
+    "Pipfile": "Pipfile.lock",
+    "package.json": "package-lock.json",
+    "Chart.yaml": "Chart.lock",
+}
+
+
+class _DirectoryRunner:
+    """Run the commands in the directories, the output is buffered when running concurrently."""
+
+    def __init__(self, args: argparse.Namespace, capture: bool, stamps: Optional[JsonCache]) -> None:
+        self.args = args
+        self.command = [*args.cmd, *args.arg]
+        self.capture = capture
+        self.stamps = stamps
+        self.profile: Optional[list[dict[str, Any]]] = [] if args.profile else None
+        self.cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._processes: set[subprocess.Popen[bytes]] = set()
+
+    def _run(self, command: list[str], cwd: Path, output: list[bytes]) -> int:
+        with trace.span("run", command=command, cwd=str(cwd)):
+            return self._run_process(command, cwd, output)
+
+    def _run_process(self, command: list[str], cwd: Path, output: list[bytes]) -> int:
+        with self._lock:
+            if self.cancelled.is_set():
+                return 1
+            start = time.perf_counter()
+            proc = subprocess.Popen(  # noqa: S603
+                command,
+                cwd=cwd,
+                stdout=subprocess.PIPE if self.capture else None,
+                stderr=subprocess.STDOUT if self.capture else None,
+                # In its own process group, to be able to terminate the sub processes on cancel
+                start_new_session=self.capture and os.name == "posix",
+            )
+            self._processes.add(proc)
+        rusage = None
+        try:
+            if self.profile is not None and hasattr(os, "wait4"):
+                stdout = proc.stdout.read() if proc.stdout is not None else None
+                if proc.stdout is not None:
+                    proc.stdout.close()
+                if hasattr(os, "waitid"):
+                    # Wait for the end of the process without reaping it, it can still be cancelled
+                    os.waitid(os.P_PID, proc.pid, os.WEXITED | os.WNOWAIT)
+                # Not cancelled after the reaping, the pid can be reused
+                with self._lock:
+                    self._processes.discard(proc)
+                # Use wait4 to get the resource usage of the child process
+                _, status, rusage = os.wait4(proc.pid, 0)
+                # Reaped outside of Popen, wait() and __exit__ should not act on the pid anymore
+                proc.returncode = os.waitstatus_to_exitcode(status)
+            else:
+                stdout, _ = proc.communicate()
+        finally:
+            with self._lock:
+                self._processes.discard(proc)
+        wall_time = time.perf_counter() - start
+        if stdout:
+            output.append(stdout)
+
+        if self.profile is not None:
+            with self._lock:
+                self.profile.append(
+                    {
+                        "directory": str(cwd),
+                        "command": command,
+                        "returncode": proc.returncode,
+                        "wall_time": wall_time,
+                        "user_time": rusage.ru_utime if rusage is not None else None,
+                        "system_time": rusage.ru_stime if rusage is not None else None,
+                        # In kilobytes, on macOS ru_maxrss is in bytes
+                        "max_rss": (
+                            (rusage.ru_maxrss // 1024 if sys.platform == "darwin" else rusage.ru_maxrss)
+                            if rusage is not None
+                            else None
+                        ),
+                    },
+                )
+        return proc.returncode
+
+    def run_directory(self, directory: Path, file_names: list[str]) -> tuple[int, bytes]:
+        """
+        Run the commands for the files of a directory.
+
+        Return the return code of the failed command (or 0) and the buffered output.
+        """
+        stamp_key = self._get_stamp_key(directory)
+        if self.stamps is not None:
+            with self._lock:
+                stamp = self.stamps.get(stamp_key)
+            if stamp is not None and stamp == self._get_stamp(directory, file_names):
+                return 0, b""
+
+        output: list[bytes] = []
+        returncode = 0
+        if self.args.batch:
+            arguments_list = _chunk_arguments(self.command, file_names, _get_max_arguments_size())
+        elif self.args.pass_filename:
+            arguments_list = [[file_name] for file_name in file_names]
+        else:
+            # Without the file name, the command is the same for all the files of the directory
+            arguments_list = [[]]
+        for arguments in arguments_list:
+            check_success = True
+            if self.args.check:
+                check_returncode = self._run(self.args.check, directory, output)
+                if check_returncode != 0:
+                    if self.args.fail_fast:
+                        return check_returncode, b"".join(output)
+                    check_success = False
+            else:
+                check_success = False
+            if not check_success:
+                cmd_returncode = self._run([*self.command, *arguments], directory, output)
+                if cmd_returncode != 0:
+                    if self.args.fail_fast:
+                        return cmd_returncode, b"".join(output)
+                    returncode = cmd_returncode
+
+        if self.stamps is not None and returncode == 0:
+            stamp = self._get_stamp(directory, file_names)
+            with self._lock:
+                self.stamps.set(stamp_key, stamp)
+        return returncode, b"".join(output)
+
+    def _get_stamp_key(self, directory: Path) -> str:
+        """Get the key of the stamp, the hooks share the stamps file, so the commands are in the key."""
+        return json.dumps(
+            [str(directory), self.args.check, self.command, self.args.pass_filename, self.args.batch]
+        )
+
+    def _get_stamp(self, directory: Path, file_names: list[str]) -> str:
+        """Get the hash of the input files and the produced lock file."""
+        stamp = hashlib.sha256()
+        lock_files = (
+            [self.args.lock_file]
+            if self.args.lock_file
+            else [_LOCK_FILES[file_name] for file_name in file_names if file_name in _LOCK_FILES]
+        )
+        for file_name in [*file_names, *lock_files]:
+            file_path = directory / file_name
+            stamp.update(f"\0{file_name}\0".encode())
+            if file_path.is_file():
+                stamp.update(hashlib.sha256(file_path.read_bytes()).digest())
+        return stamp.hexdigest()
+
+    def cancel(self) -> None:
+        """Don't start new commands and terminate the running ones."""
+        with self._lock:
+            self.cancelled.set()
+            for proc in self._processes:
+                if self.capture and os.name == "posix":
+                    with contextlib.suppress(ProcessLookupError):
+                        os.killpg(proc.pid, signal.SIGTERM)
+                else:
+                    proc.terminate()
+
+
+def _print_profile(profile: list[dict[str, Any]], profile_path: Path) -> None:
+    """Print the profile as a table, the slowest commands first, and write it in the JSON file."""
+
+    def format_time(value: Optional[float]) -> str:
+        return "" if value is None else f"{value:.2f}"
+
+    rows = [("Wall (s)", "User (s)", "System (s)", "Max RSS (KiB)", "Return", "Directory", "Command")]
+    rows += [
+        (
+            format_time(entry["wall_time"]),
+            format_time(entry["user_time"]),
+            format_time(entry["system_time"]),
+            "" if entry["max_rss"] is None else str(entry["max_rss"]),
+            str(entry["returncode"]),
+            os.path.relpath(entry["directory"]),
+            shlex.join(entry["command"]),
+        )
+        for entry in sorted(profile, key=lambda entry: entry["wall_time"], reverse=True)
+    ]
+    widths = [max(len(row[index]) for row in rows) for index in range(len(rows[0]) - 1)]
+    for row in rows:
+        print("  ".join([*(cell.ljust(width) for cell, width in zip(row, widths)), row[-1]]))
+
+    with profile_path.open("w", encoding="utf-8") as profile_file:
+        json.dump(profile, profile_file, indent=2)
+
+
+def _get_max_arguments_size() -> int:
+    """Get the maximum size of the command line arguments, like xargs."""
+    if os.name != "posix":
+        # Windows command line limit
+        return 32000
+    arg_max = os.sysconf("SC_ARG_MAX")
+    # The environment is in the same space, with the pointers
+    environment_size = sum(len(key) + len(value) + 2 + 8 for key, value in os.environb.items())
+    return max(4096, min(arg_max - environment_size - 2048, 128 * 1024))
+
+
+def _chunk_arguments(command: list[str], arguments: list[str], max_size: int) -> list[list[str]]:
+    """Split the arguments in chunks, to keep the size of each command line lower than max_size."""
+
+    def size(argument: str) -> int:
+        # With the null terminator and the pointer
+        return len(os.fsencode(argument)) + 1 + 8
+
+    command_size = sum(size(argument) for argument in command)
+    chunks: list[list[str]] = []
+    chunk: list[str] = []
+    chunk_size = command_size
+    for argument in arguments:
+        argument_size = size(argument)
+        if chunk and chunk_size + argument_size > max_size:
+            chunks.append(chunk)
+            chunk = []
+            chunk_size = command_size
+        chunk.append(argument)
+        chunk_size += argument_size
+    if chunk:
+        chunks.append(chunk)
+    return chunks
 
 
 def main() -> None:
@@ -21,42 +258,93 @@ def main() -> None:
     )
     parser.add_argument("--fail-fast", action="store_true", help="Fail on the first error")
     parser.add_argument("--pass-filename", action="store_true", help="Pass the filename to the command")
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Pass all the filenames of a directory to one command, split like xargs on long command lines",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=positive_int,
+        default=1,
+        help="The number of directories processed concurrently, the output of each directory is buffered",
+    )
+    parser.add_argument(
+        "--stamp",
+        action="store_true",
+        help="Skip the directories where the files and the lock file didn't change since the last success",
+    )
+    parser.add_argument(
+        "--lock-file",
+        help="The lock file produced by the command, used in the stamp (default: guessed from the file name)",
+    )
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        help="Print the time and the resources used by each command, and write them in this JSON file",
+    )
     parser.add_argument("--check", nargs="+", help="The check command")
     parser.add_argument("--cmd", nargs="+", help="The command", required=True)
     parser.add_argument("-a", "--arg", "--args", nargs="+", help="The args", default=[])
     parser.add_argument("--files", nargs="+", help="The files", required=True)
+    trace.add_argument(parser)
     args = parser.parse_args()
+    trace.setup(args.trace)
 
-    command = [*args.cmd, *args.arg]
-    success = True
+    # The directories, in the order of the files, with their files
+    directories: dict[Path, list[str]] = {}
     for file_path in [Path(filename) for filename in args.files]:
         file_path = Path.cwd() / file_path  # noqa: PLW2901
-        check_success = True
-        if args.check:
-            proc = subprocess.run(  # pylint: disable=subprocess-run-check # noqa: S603
-                args.check,
-                cwd=file_path.parent,
-                check=False,
-            )
-            if proc.returncode != 0:
-                if args.fail_fast:
-                    sys.exit(proc.returncode)
-                check_success = False
-        else:
-            check_success = False
-        if not check_success:
-            proc = subprocess.run(  # pylint: disable=subprocess-run-check # noqa: S603
-                [*command, file_path.name] if args.pass_filename else command,
-                cwd=file_path.parent,
-                check=False,
-            )
-            if proc.returncode != 0:
-                if args.fail_fast:
-                    sys.exit(proc.returncode)
-                success = False
+        file_names = directories.setdefault(file_path.parent, [])
+        if file_path.name not in file_names:
+            file_names.append(file_path.name)
+
+    stamps = JsonCache(get_cache_dir() / "run-in-dir.json", hash_inputs()) if args.stamp else None
+    runner = _DirectoryRunner(args, capture=args.jobs > 1, stamps=stamps)
+    try:
+        success = _run(args, runner, directories)
+    finally:
+        if stamps is not None:
+            stamps.save()
+        if runner.profile is not None:
+            _print_profile(runner.profile, args.profile)
     if not success:
         sys.exit(1)
 
 
+def _run(args: argparse.Namespace, runner: _DirectoryRunner, directories: dict[Path, list[str]]) -> bool:
+    """Run the commands in all the directories, return the success."""
+    success = True
+    if args.jobs <= 1:
+        for directory, file_names in directories.items():
+            returncode, _ = runner.run_directory(directory, file_names)
+            if returncode != 0:
+                if args.fail_fast:
+                    sys.exit(returncode)
+                success = False
+    else:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=args.jobs) as executor:
+            futures = [
+                executor.submit(runner.run_directory, directory, file_names)
+                for directory, file_names in directories.items()
+            ]
+            try:
+                for future in concurrent.futures.as_completed(futures):
+                    returncode, output = future.result()
+                    sys.stdout.buffer.write(output)
+                    sys.stdout.buffer.flush()
+                    if returncode != 0:
+                        if args.fail_fast:
+                            sys.exit(returncode)
+                        success = False
+            except BaseException:
+                # On fail fast or on interrupt, the commands are in their own process group,
+                # so they don't get the Ctrl-C
+                runner.cancel()
+                executor.shutdown(wait=True, cancel_futures=True)
+                raise
+    return success
+
+
 if __name__ == "__main__":
     main()
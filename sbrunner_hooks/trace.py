@@ -0,0 +1,139 @@
+# Copyright (c) 2026, Stéphane Brunner
+"""
+Record the time spent in the hooks, as a Chrome trace, that can be opened in Perfetto or `chrome://tracing`.
+
+The tracing is enabled with the `--trace <file>` option of the hooks, or with the `SBRUNNER_HOOKS_TRACE`
+environment variable, the file is written at the end of the process. When the tracing is disabled, `span`
+returns a shared null context manager.
+"""
+
+import argparse
+import atexit
+import contextlib
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Optional
+
+ENVIRONMENT_VARIABLE = "SBRUNNER_HOOKS_TRACE"
+
+_NULL_SPAN = contextlib.nullcontext()
+
+# The recorded events, None when the tracing is disabled
+_EVENTS: Optional[list[dict[str, Any]]] = None
+_OUTPUT: Optional[Path] = None
+_START = 0
+_THREADS: dict[int, str] = {}
+_SAVE_REGISTERED = False
+
+
+class _Span:
+    """Record a complete event, from the enter to the exit."""
+
+    __slots__ = ("args", "name", "start")
+
+    def __init__(self, name: str, args: dict[str, Any]) -> None:
+        self.name = name
+        self.args = args
+        self.start = 0
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter_ns()
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        end = time.perf_counter_ns()
+        thread_id = threading.get_ident()
+        if thread_id not in _THREADS:
+            _THREADS[thread_id] = threading.current_thread().name
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        if _EVENTS is not None:
+            _EVENTS.append(
+                {
+                    "name": self.name,
+                    "ph": "X",
+                    "ts": (self.start - _START) / 1000,
+                    "dur": (end - self.start) / 1000,
+                    "pid": os.getpid(),
+                    "tid": thread_id,
+                    "args": self.args,
+                },
+            )
+
+
+def span(name: str, **args: Any) -> contextlib.AbstractContextManager[Any]:
+    """Get a context manager that records the time spent in it, the arguments should be serializable in JSON."""
+    if _EVENTS is None:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def is_enabled() -> bool:
+    """Check that the tracing is enabled."""
+    return _EVENTS is not None
+
+
+def enable(output: Path) -> None:
+    """Enable the tracing, the trace will be written in the output file at the end of the process."""
+    global _EVENTS, _OUTPUT, _START, _SAVE_REGISTERED  # noqa: PLW0603 # pylint: disable=global-statement
+    if _EVENTS is not None:
+        # Already enabled, e.g. by `sbrunner-hooks run`
+        return
+    _EVENTS = []
+    _OUTPUT = output.absolute()
+    _START = time.perf_counter_ns()
+    if not _SAVE_REGISTERED:
+        atexit.register(save)
+        _SAVE_REGISTERED = True
+
+
+def add_argument(parser: argparse.ArgumentParser) -> None:
+    """Add the `--trace` option to the parser."""
+    parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        help="Write a Chrome trace of the run in the file, to be opened in Perfetto "
+        f"(default: the {ENVIRONMENT_VARIABLE} environment variable)",
+    )
+
+
+def setup(output: Optional[str]) -> None:
+    """Enable the tracing if an output is given by the option or by the environment variable."""
+    output = output or os.environ.get(ENVIRONMENT_VARIABLE)
+    if output:
+        enable(Path(output))
+
+
+def save() -> None:
+    """Write the recorded events in the output file."""
+    import json  # noqa: PLC0415 # pylint: disable=import-outside-toplevel
+
+    if _EVENTS is None or _OUTPUT is None:
+        return
+    pid = os.getpid()
+    metadata = [
+        {"name": "process_name", "ph": "M", "pid": pid, "args": {"name": Path(sys.argv[0]).name}},
+        *(
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": thread_id, "args": {"name": thread_name}}
+            for thread_id, thread_name in _THREADS.items()
+        ),
+    ]
+    with _OUTPUT.open("w", encoding="utf-8") as output_file:
+        json.dump({"traceEvents": [*metadata, *_EVENTS], "displayTimeUnit": "ms"}, output_file)
+
+
+def flush() -> None:
+    """Write the recorded events and disable the tracing, e.g. at the end of a request of the daemon."""
+    global _EVENTS, _OUTPUT  # noqa: PLW0603 # pylint: disable=global-statement
+    save()
+    _EVENTS = None
+    _OUTPUT = None
+    _THREADS.clear()
@@ -0,0 +1,191 @@
+# Copyright (c) 2026, Stéphane Brunner
+"""
+Watch the files, and process only the changed ones.
+
+On Linux the directories are watched with inotify, elsewhere they are polled.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import shutil
+import struct
+import subprocess  # nosec
+import sys
+import time
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import Optional, Protocol
+
+from sbrunner_hooks.index import get_index
+
+# The flags of inotify, see inotify(7)
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+# struct inotify_event: int wd, uint32_t mask, uint32_t cookie, uint32_t len, char name[len]
+_EVENT_HEADER = struct.Struct("iIII")
+
+# The state of a file, to detect the changes
+_FileState = tuple[int, int]
+
+
+def _get_state(file_name: str) -> Optional[_FileState]:
+    try:
+        file_stat = Path(file_name).stat()
+    except OSError:
+        return None
+    return file_stat.st_mtime_ns, file_stat.st_size
+
+
+class _Watcher(Protocol):
+    def read(self, timeout: Optional[float]) -> set[str]:
+        """Get the changed files, wait for the first change at most the timeout, forever if None."""
+
+    def close(self) -> None:
+        """Release the resources."""
+
+
+class _InotifyWatcher:
+    """Watch the directories with inotify, the events are filtered on the written and moved files."""
+
+    def __init__(self, directories: Iterable[str]) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._fd = libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+        self._directories: dict[int, str] = {}
+        for directory in directories:
+            watch_descriptor = self._add_watch(
+                self._fd,
+                os.fsencode(directory),
+                _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_ONLYDIR,
+            )
+            if watch_descriptor < 0:
+                error = ctypes.get_errno()
+                self.close()
+                raise OSError(error, f"{os.strerror(error)}: '{directory}'")
+            self._directories[watch_descriptor] = directory
+
+    def read(self, timeout: Optional[float]) -> set[str]:
+        if not select.select([self._fd], [], [], timeout)[0]:
+            return set()
+        data = os.read(self._fd, 65536)
+        changed: set[str] = set()
+        offset = 0
+        while offset < len(data):
+            watch_descriptor, mask, _, name_length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset : offset + name_length].rstrip(b"\0")
+            offset += name_length
+            if mask & _IN_Q_OVERFLOW:
+                # Some events are lost, consider all the files as changed
+                for directory in self._directories.values():
+                    changed.update(
+                        str(Path(entry.path)) for entry in os.scandir(directory) if entry.is_file()
+                    )
+            elif not mask & _IN_IGNORED and watch_descriptor in self._directories:
+                changed.add(str(Path(self._directories[watch_descriptor]) / os.fsdecode(name)))
+        return changed
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class _PollingWatcher:
+    """Watch the directories by comparing the state of their files at each interval."""
+
+    def __init__(self, directories: Iterable[str], interval: float) -> None:
+        self._directories = list(directories)
+        self._interval = interval
+        self._states = self._get_states()
+
+    def _get_states(self) -> dict[str, Optional[_FileState]]:
+        states: dict[str, Optional[_FileState]] = {}
+        for directory in self._directories:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        file_stat = entry.stat()
+                        states[str(Path(entry.path))] = (file_stat.st_mtime_ns, file_stat.st_size)
+        return states
+
+    def read(self, timeout: Optional[float]) -> set[str]:
+        time.sleep(self._interval if timeout is None else min(timeout, self._interval))
+        states = self._get_states()
+        changed = {file_name for file_name, state in states.items() if self._states.get(file_name) != state}
+        self._states = states
+        return changed
+
+    def close(self) -> None:
+        pass
+
+
+def get_directories(files: Iterable[str]) -> list[str]:
+    """
+    Get the directories to watch: the current directory and the directories of the tracked files.
+
+    The files are the given ones, without Git.
+    """
+    git_cmd = shutil.which("git")
+    if git_cmd is not None:
+        try:
+            files = [*files, *get_index(git_cmd).files()]
+        except subprocess.CalledProcessError:
+            pass
+    return sorted({".", *(str(Path(file_name).parent) for file_name in files)})
+
+
+def watch(
+    directories: Iterable[str],
+    accept: Callable[[str], bool],
+    process: Callable[[list[str]], object],
+    debounce: float = 0.2,
+    poll_interval: float = 1.0,
+    should_stop: Callable[[], bool] = lambda: False,
+    watcher: Optional[_Watcher] = None,
+) -> None:
+    """
+    Call the process function with the accepted files that changed in the directories.
+
+    The events are collected until no event comes during the debounce delay, and the files
+    written by the process function itself are not processed again.
+
+    The watcher is created for the directories when not given.
+    """
+    if watcher is None:
+        try:
+            watcher = _InotifyWatcher(directories)
+        except (OSError, AttributeError) as error:
+            # Not on Linux, or not enough inotify watches
+            print(f"Watching the files by polling ({error!s}).", file=sys.stderr)
+            watcher = _PollingWatcher(directories, poll_interval)
+    # The state of the files after their processing
+    processed: dict[str, Optional[_FileState]] = {}
+    try:
+        while not should_stop():
+            changed = watcher.read(poll_interval)
+            if not changed:
+                continue
+            while True:
+                more = watcher.read(debounce)
+                if not more:
+                    break
+                changed |= more
+            files = [
+                file_name
+                for file_name in sorted(changed)
+                if accept(file_name)
+                and Path(file_name).is_file()
+                and (file_name not in processed or processed[file_name] != _get_state(file_name))
+            ]
+            if files:
+                process(files)
+                processed.update((file_name, _get_state(file_name)) for file_name in files)
+    finally:
+        watcher.close()
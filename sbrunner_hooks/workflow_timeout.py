@@ -1,33 +1,169 @@
 """Check that the GitHub workflow has a timeout."""
 
 import argparse
+import contextlib
+import shutil
+import subprocess  # nosec
 import sys
+from collections.abc import Generator, Iterator
 from pathlib import Path
 
 import yaml
 
+from sbrunner_hooks import trace, yaml_loader
+from sbrunner_hooks.index import get_index
+
+_NULL_VALUES = ("", "~", "null", "Null", "NULL")
+
+
+class _StreamFallbackError(Exception):
+    """The workflow uses aliases or merge keys, it can't be checked with the events only."""
+
+
+def _get_missing_timeouts(filename: Path) -> list[str]:
+    """Get the messages of the jobs without timeout, from the loaded workflow."""
+    with filename.open(encoding="utf-8") as open_file:
+        workflow = yaml_loader.load(open_file)
+
+    return [
+        f"The workflow '{filename}', job '{name}' has no timeout"
+        for name, job in workflow.get("jobs").items()
+        if job.get("timeout-minutes") is None
+    ]
+
+
+def _get_missing_timeouts_streamed(filename: Path) -> list[str]:
+    """
+    Get the messages of the jobs without timeout, from the YAML events.
+
+    Only the `jobs` mapping is followed, the other nodes (steps, matrices, scripts, ...) are skipped
+    without being built, and the messages get the location of the job.
+    """
+    try:
+        with filename.open(encoding="utf-8") as open_file:
+            return [
+                f"{filename}:{line}:{column}: The workflow '{filename}', job '{name}' has no timeout"
+                for name, line, column in _iter_missing_timeouts(yaml_loader.parse(open_file))
+            ]
+    except _StreamFallbackError:
+        return _get_missing_timeouts(filename)
+
+
+def _iter_missing_timeouts(events: Iterator[yaml.Event]) -> Generator[tuple[str, int, int], None, None]:
+    """Get the name, the line and the column of the jobs without timeout."""
+    for event in events:
+        if isinstance(event, yaml.DocumentStartEvent):
+            root = next(events)
+            if not isinstance(root, yaml.MappingStartEvent):
+                _skip_node(events, root)
+                continue
+            for key, value in _iter_mapping(events):
+                if key.value == "jobs" and isinstance(value, yaml.MappingStartEvent):
+                    for job_key, job in _iter_mapping(events):
+                        if not _has_timeout(events, job):
+                            mark = job_key.start_mark
+                            yield job_key.value, mark.line + 1 if mark else 0, mark.column + 1 if mark else 0
+                else:
+                    _skip_node(events, value)
+
+
+def _iter_mapping(events: Iterator[yaml.Event]) -> Generator[tuple[yaml.ScalarEvent, yaml.Event], None, None]:
+    """
+    Get the scalar keys and the first event of the values of a mapping.
+
+    The value node should be consumed by the caller before getting the next item.
+    """
+    while True:
+        key = next(events)
+        if isinstance(key, yaml.MappingEndEvent):
+            return
+        if isinstance(key, yaml.CollectionStartEvent):
+            # Complex key
+            _skip_node(events, key)
+            _skip_node(events, next(events))
+            continue
+        value = next(events)
+        if not isinstance(key, yaml.ScalarEvent) or key.value == "<<" or isinstance(value, yaml.AliasEvent):
+            raise _StreamFallbackError
+        yield key, value
+
+
+def _has_timeout(events: Iterator[yaml.Event], job: yaml.Event) -> bool:
+    """Check that the job node has a not null `timeout-minutes`, and consume it."""
+    if not isinstance(job, yaml.MappingStartEvent):
+        _skip_node(events, job)
+        return False
+    has_timeout = False
+    for key, value in _iter_mapping(events):
+        if key.value == "timeout-minutes":
+            has_timeout = not _is_null(value)
+        _skip_node(events, value)
+    return has_timeout
+
+
+def _is_null(event: yaml.Event) -> bool:
+    """Check that the event is a null scalar."""
+    if not isinstance(event, yaml.ScalarEvent):
+        return False
+    if event.tag is None:
+        return event.implicit[0] and event.value in _NULL_VALUES
+    return event.tag == "tag:yaml.org,2002:null"
+
+
+def _skip_node(events: Iterator[yaml.Event], event: yaml.Event) -> None:
+    """Skip the events of the node starting with the event, without building it."""
+    depth = 1 if isinstance(event, yaml.CollectionStartEvent) else 0
+    while depth:
+        event = next(events)
+        if isinstance(event, yaml.CollectionStartEvent):
+            depth += 1
+        elif isinstance(event, yaml.CollectionEndEvent):
+            depth -= 1
+
+
+def _list_workflows() -> list[Path]:
+    """List the workflows tracked by Git, or present in the workflows directory without Git."""
+    git_cmd = shutil.which("git")
+    if git_cmd is not None:
+        with contextlib.suppress(subprocess.CalledProcessError):
+            return [Path(file_name) for file_name in get_index(git_cmd).files(["workflow"])]
+    return sorted([*Path().glob(".github/workflows/*.yaml"), *Path().glob(".github/workflows/*.yml")])
+
 
 def main() -> None:
     """Check that the GitHub workflow has a timeout."""
     parser = argparse.ArgumentParser(description="""Check that the GitHub workflow has a timeout.""")
+    parser.add_argument("--verbose", action="store_true", help="Verbose mode")
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Check the workflows from the YAML events, without loading them, useful for huge workflows",
+    )
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Check all the workflows tracked by Git, without using pre-commit",
+    )
+    trace.add_argument(parser)
     parser.add_argument("files", nargs=argparse.REMAINDER, help="The files to check")
     args = parser.parse_args()
+    trace.setup(args.trace)
+
+    if args.verbose:
+        yaml_loader.print_backend()
 
     success = True
     files = [Path(filename) for filename in args.files]
-    if not files:
-        files = [
-            *Path(".").glob("github/workflows/*.yaml"),  # noqa: PTH201
-            *Path().glob("github/workflows/*.yml"),
-        ]
+    if args.all or not files:
+        files += _list_workflows()
     for filename in files:
-        with filename.open(encoding="utf-8") as open_file:
-            workflow = yaml.load(open_file, Loader=yaml.SafeLoader)
-
-        for name, job in workflow.get("jobs").items():
-            if job.get("timeout-minutes") is None:
-                print(f"The workflow '{filename}', job '{name}' has no timeout")
-                success = False
+        with trace.span("check workflow", file=str(filename)):
+            messages = (
+                _get_missing_timeouts_streamed(filename) if args.stream else _get_missing_timeouts(filename)
+            )
+        for message in messages:
+            print(message)
+            success = False
 
     if not success:
         sys.exit(1)
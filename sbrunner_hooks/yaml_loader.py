@@ -0,0 +1,39 @@
+# Copyright (c) 2026, Stéphane Brunner
+"""Load the YAML files with the libyaml C loader when available."""
+
+from collections.abc import Iterator
+from typing import IO, TYPE_CHECKING, Any, Union
+
+import yaml
+
+if TYPE_CHECKING:
+    # CSafeLoader is not a subclass of SafeLoader, and it's missing when PyYAML is built without libyaml
+    _Loader = type[Union[yaml.SafeLoader, yaml.CSafeLoader]]
+else:
+    _Loader = type
+
+# The C loader is only available when PyYAML is built with libyaml
+SafeLoader: _Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def get_backend() -> str:
+    """Get the name of the used YAML loader."""
+    return "libyaml" if SafeLoader is not yaml.SafeLoader else "pure Python"
+
+
+def print_backend() -> None:
+    """Print the used YAML loader, in verbose mode."""
+    print(f"Use the {get_backend()} YAML loader.")
+
+
+def load(stream: Union[str, bytes, IO[str], IO[bytes]], loader: _Loader = SafeLoader) -> Any:
+    """Load a YAML document, with the libyaml C loader when available."""
+    return yaml.load(stream, Loader=loader)  # noqa: S506 # nosec
+
+
+def parse(
+    stream: Union[str, bytes, IO[str], IO[bytes]],
+    loader: _Loader = SafeLoader,
+) -> Iterator[yaml.Event]:
+    """Parse a YAML stream in events, with the libyaml C parser when available."""
+    return yaml.parse(stream, Loader=loader)
@@ -0,0 +1,30 @@
+from pathlib import Path
+
+from sbrunner_hooks.cache import JsonCache, hash_inputs
+
+
+def test_json_cache_eviction(tmp_path: Path) -> None:
+    cache_path = tmp_path / "cache.json"
+    cache = JsonCache(cache_path, hash_inputs("config"), max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    cache.save()
+
+    cache = JsonCache(cache_path, hash_inputs("config"), max_entries=2)
+    # "b" is the least recently used entry
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_json_cache_invalidation(tmp_path: Path) -> None:
+    cache_path = tmp_path / "cache.json"
+    cache = JsonCache(cache_path, hash_inputs("config", "2025"))
+    cache.set("a", 1)
+    cache.save()
+
+    assert JsonCache(cache_path, hash_inputs("config", "2025")).get("a") == 1
+    assert JsonCache(cache_path, hash_inputs("config", "2026")).get("a") is None
+    assert JsonCache(cache_path, hash_inputs("other config", "2025")).get("a") is None
@@ -1,8 +1,23 @@
+import re
+import sys
 from pathlib import Path
+from unittest.mock import patch
 
+import pytest
 import tomlkit
 
-from sbrunner_hooks.canonicalize import _canonicalize_pyproject
+from sbrunner_hooks import canonicalize
+from sbrunner_hooks.canonicalize import (
+    _canonicalize_file,
+    _canonicalize_pre_commit_exclude,
+    _canonicalize_pyproject,
+    _is_canonical_pyproject,
+    _join,
+    _KeyOrder,
+    _optimize_alternatives,
+    _split_alternatives,
+    _tokenize_regex,
+)
 
 
 def test_canonicalize_pyproject_keeps_data_and_preserves_section_order(tmp_path: Path) -> None:
@@ -71,3 +86,144 @@ line-length = 110
     assert content.index("[tool.abc]") < content.index("[tool.poetry]")
     assert content.index("[tool.poetry]") < content.index("[project]")
     assert content.index("[project]") < content.index("[build-system]")
+
+
+def test_key_order() -> None:
+    key_order = _KeyOrder(["name", "on"], ["jobs", "env"])
+
+    ordered = key_order.apply({"env": 1, "b": 2, "jobs": 3, "on": 4, "a": 5, "name": 6})
+
+    assert list(ordered.keys()) == ["name", "on", "b", "a", "jobs", "env"]
+    assert list(key_order.apply({"b": 1, "a": 2}).keys()) == ["b", "a"]
+
+
+def test_canonicalize_file_workflow(tmp_path: Path) -> None:
+    """The GitHub workflows are matched by the hook but kept as is."""
+    file_path = tmp_path / "test.yaml"
+    content = "jobs:\n  test:\n    runs-on: ubuntu-latest\n    name: Test\non: push\nname: Test\n"
+    file_path.write_text(content, encoding="utf-8")
+
+    assert _canonicalize_file(file_path, "workflow") == []
+    assert file_path.read_text(encoding="utf-8") == content
+
+
+@pytest.mark.parametrize(
+    ("content", "canonical"),
+    [
+        (
+            '[tool.ruff]\nx = 1\n[tool.ruff.lint]\ny = 2\n\n[tool.a]\nz = """\n[b]\n"""\n\n[project]\nname = "a"\n',
+            True,
+        ),
+        ('[tool.ruff]\nx = [\n  "a",\n]\n\n[project]\n# comment\n"a.b" = 1\n\n[build-system]\nx = 1\n', True),
+        ('[tool.ruff]\nx = 1\n\n# comment\n[project]\nname = "a"\n', False),
+        ('[tool.ruff]\nx = 1\n\n[project]\nname = "a"\n\n', False),
+        ("[tool.ruff]\nx = 1\n\n[tool.a]\nx = 1\n\n[tool.ruff.lint]\nx = 1\n", False),
+        ('[project.urls]\nx = 1\n\n[project]\nname = "a"\n', False),
+        ("[tool.b]\nx = 1\n\n[tool.a]\nx = 1\n", False),
+        ('[project]\nname = "a"\n\n[tool.a]\nx = 1\n', False),
+        ("[tool.a]\nx = 1\n[tool.b]\nx = 1\n", False),
+    ],
+)
+def test_is_canonical_pyproject(tmp_path: Path, content: str, canonical: bool) -> None:
+    assert _is_canonical_pyproject(content) == canonical
+
+    pyproject = tmp_path / "pyproject.toml"
+    pyproject.write_text(content, encoding="utf-8")
+    with patch("sbrunner_hooks.canonicalize._is_canonical_pyproject", return_value=False):
+        _canonicalize_pyproject(pyproject)
+    assert (pyproject.read_text(encoding="utf-8") == content) == canonical
+
+
+@pytest.mark.parametrize(
+    ("pattern", "expected"),
+    [
+        ("a|b", ["a", "b"]),
+        ("((a|b)|c)|d", ["((a|b)|c)", "d"]),
+        (r"[|(]a|\(b|c(?#x|y)", ["[|(]a", r"\(b", "c(?#x|y)"]),
+        ("(?P<name>a|b)\n  | c d", ["(?P<name>a|b)", "cd"]),
+        (r"\N{EM DASH} a|\x41b|\0123", [r"\N{EM DASH}a", r"\x41b", r"\0123"]),
+    ],
+)
+def test_split_alternatives(pattern: str, expected: list[str]) -> None:
+    assert [_join(alternative) for alternative in _split_alternatives(_tokenize_regex(pattern))] == expected
+
+
+@pytest.mark.parametrize(
+    ("exclude", "expected"),
+    [
+        (
+            "(?x)^(  a|  ((b|c)|d)\n|e\n  )$",
+            "(?x)^(\n  a\n  |((b|c)|d)\n  |e\n)$",
+        ),
+        ("(?x)(?:a|b)", "(?x)(?:\n  a\n  |b\n)"),
+        ("^poetry.lock$", None),
+        ("(?x)^(a)$|b", None),
+        ("(?x)^(a # comment\n|b)$", None),
+        ("(?x)^(\\N{EM DASH}x|y)$", "(?x)^(\n  \\N{EM DASH}x\n  |y\n)$"),
+    ],
+)
+def test_canonicalize_pre_commit_exclude(exclude: str, expected: str | None) -> None:
+    result = _canonicalize_pre_commit_exclude(exclude)
+    assert (None if result is None else str(result)) == expected
+
+
+def test_optimize_pre_commit_exclude(monkeypatch: pytest.MonkeyPatch) -> None:
+    exclude = (
+        "(?x)^(\n  \\.gitattributes\n  |\\.gitignore\n  |\\.gitignore\n  |docs/a\\.md\n  |docs/b?\\.md\n)$"
+    )
+    paths = [".gitattributes", ".gitignore", ".github/file", "docs/a.md", "docs/.md", "docs/c.md"]
+    messages: list[str] = []
+
+    result = _canonicalize_pre_commit_exclude(exclude, paths, messages)
+
+    assert str(result) == "(?x)^(\n  \\.git(?:attributes|ignore)\n  |docs/(?:a\\.md|b?\\.md)\n)$"
+    assert messages == []
+
+    # Not used when it doesn't match the same files
+    monkeypatch.setattr(canonicalize, "_optimize_alternatives", lambda alternatives: ["docs/"])
+    result = _canonicalize_pre_commit_exclude(exclude, paths, messages)
+
+    assert str(result) == (
+        "(?x)^(\n  \\.gitattributes\n  |\\.gitignore\n  |\\.gitignore\n  |docs/a\\.md\n  |docs/b?\\.md\n)$"
+    )
+    assert len(messages) == 1
+
+
+@pytest.mark.parametrize(
+    ("alternatives", "expected"),
+    [
+        (["ab", "c", "ad", "ab"], ["a(?:b|d)", "c"]),
+        ([r"\012", r"\013"], [r"\012", r"\013"]),
+        ([r"\x41b", r"\x41c"], [r"\x41(?:b|c)"]),
+        ([r"\.a", r"\.b", ".a", ".b", "^a", "^b"], [r"\.(?:a|b)", ".a", ".b", "^a", "^b"]),
+        (["a*b", "a*c", "ab", "a"], ["a*b", "a*c", "a(?:b|)"]),
+        (["(?>ab)", "xa", "xb"], None),
+        (["a++b", "xa", "xb"], None),
+        (["(?i:a)", "xa", "xb"], None),
+        ([r"(a)\1", "(a)b"], None),
+    ],
+)
+def test_optimize_alternatives(alternatives: list[str], expected: list[str] | None) -> None:
+    optimized = _optimize_alternatives([_tokenize_regex(alternative) for alternative in alternatives])
+
+    assert optimized == expected
+    if optimized is not None:
+        # Equivalent on the paths that are not tracked
+        paths = ["\n", "\x012", "\x0b", "A", "Ab", "ab", "ac", "ad", "a", "aab", "b", "c", ".a", "xa", "-b"]
+        pattern = re.compile(f"^(?:{'|'.join(alternatives)})$")
+        optimized_pattern = re.compile(f"^(?:{'|'.join(optimized)})$")
+        assert [bool(pattern.search(path)) for path in paths] == [
+            bool(optimized_pattern.search(path)) for path in paths
+        ]
+
+
+@pytest.mark.parametrize("jobs", ["0", "-1", "a"])
+def test_invalid_jobs(monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str], jobs: str) -> None:
+    """The number of jobs should be a positive integer."""
+    monkeypatch.setattr(sys, "argv", ["canonicalize", f"--jobs={jobs}", "pyproject.toml"])
+
+    with pytest.raises(SystemExit) as excinfo:
+        canonicalize.main()
+
+    assert excinfo.value.code == 2
+    assert "--jobs: invalid positive integer value" in capsys.readouterr().err
@@ -1,8 +1,27 @@
+import functools
+import os
 import re
+import shutil
+import subprocess
+import sys
+from pathlib import Path
 
 import pytest
 
-from sbrunner_hooks.copyright import update_file
+from sbrunner_hooks import copyright as copyright_
+from sbrunner_hooks.copyright import (
+    _get_bytes_patterns,
+    _get_git_state,
+    _get_git_states_batch,
+    _get_git_states_history,
+    _get_used_years,
+    _list_files,
+    _process_file,
+    _update_file_header,
+    get_current_year,
+    main,
+    update_file,
+)
 
 
 @pytest.mark.parametrize(
@@ -34,3 +53,340 @@ def test_update_file(content: str, expected: str, expected_updated: bool, requir
 
     assert updated == expected_updated
     assert content == expected
+
+
+def _git(cwd: Path, *args: str, date: str = "2021-06-01T12:00:00+00:00") -> None:
+    subprocess.run(
+        ["git", *args],
+        cwd=cwd,
+        check=True,
+        stdout=subprocess.DEVNULL,
+        env={
+            **os.environ,
+            "GIT_AUTHOR_DATE": date,
+            "GIT_COMMITTER_DATE": date,
+            "GIT_AUTHOR_NAME": "Test",
+            "GIT_AUTHOR_EMAIL": "test@example.com",
+            "GIT_COMMITTER_NAME": "Test",
+            "GIT_COMMITTER_EMAIL": "test@example.com",
+        },
+    )
+
+
+def test_git_states_batch(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """The batch mode should give the same Git states as the per file mode."""
+    _git(tmp_path, "init", "--quiet")
+    (tmp_path / "LICENSE").write_text("license")
+    (tmp_path / "old.txt").write_text("old")
+    (tmp_path / "renamed.txt").write_text("renamed")
+    (tmp_path / "dir").mkdir()
+    (tmp_path / "dir" / "file name.txt").write_text("file")
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "commit", "--quiet", "--message=First", date="2020-06-01T12:00:00+00:00")
+    _git(tmp_path, "mv", "renamed.txt", "dir/new.txt")
+    (tmp_path / "dir" / "file name.txt").write_text("file 2")
+    _git(tmp_path, "commit", "--quiet", "--all", "--message=Second")
+    (tmp_path / "modified.txt").write_text("modified")
+    (tmp_path / "old.txt").write_text("old 2")
+
+    monkeypatch.chdir(tmp_path / "dir")
+    git_cmd = shutil.which("git")
+    assert git_cmd is not None
+    files = ["../LICENSE", "../old.txt", "new.txt", "file name.txt", "../modified.txt", "unknown.txt"]
+
+    states = _get_git_states_batch(git_cmd, files, "../LICENSE")
+
+    assert states == {file_name: _get_git_state(git_cmd, file_name, "../LICENSE") for file_name in files}
+    current_year = get_current_year()
+    assert _get_used_years(files, states, verbose=False) == {
+        "../LICENSE": "2021",
+        "../old.txt": current_year,
+        "new.txt": "2021",
+        "file name.txt": "2021",
+        "../modified.txt": current_year,
+        "unknown.txt": current_year,
+    }
+
+
+def test_git_states_history(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """The first year should follow the renames, the last commit date should be the same as the batch mode."""
+    _git(tmp_path, "init", "--quiet")
+    (tmp_path / "LICENSE").write_text("license")
+    (tmp_path / "old.txt").write_text("old")
+    (tmp_path / "renamed.txt").write_text("renamed content, long enough to be detected as a rename\n" * 3)
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "commit", "--quiet", "--message=First", date="2018-06-01T12:00:00+00:00")
+    (tmp_path / "dir").mkdir()
+    _git(tmp_path, "mv", "renamed.txt", "dir/new.txt")
+    (tmp_path / "dir" / "file.txt").write_text("file")
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "commit", "--quiet", "--message=Second", date="2020-06-01T12:00:00+00:00")
+    (tmp_path / "dir" / "file.txt").write_text("file 2")
+    _git(tmp_path, "commit", "--quiet", "--all", "--message=Third")
+    (tmp_path / "modified.txt").write_text("modified")
+    (tmp_path / "old.txt").write_text("old 2")
+
+    monkeypatch.chdir(tmp_path / "dir")
+    git_cmd = shutil.which("git")
+    assert git_cmd is not None
+    files = ["../LICENSE", "../old.txt", "new.txt", "file.txt", "../modified.txt"]
+
+    states, first_years = _get_git_states_history(git_cmd, files, "../LICENSE")
+
+    assert states == _get_git_states_batch(git_cmd, files, "../LICENSE")
+    assert first_years == {
+        "../LICENSE": "2018",
+        "../old.txt": "2018",
+        "new.txt": "2018",
+        "file.txt": "2020",
+    }
+
+
+def test_git_states_history_deleted(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """A file recreated after a deletion should not get the first year of the deleted file."""
+    _git(tmp_path, "init", "--quiet")
+    (tmp_path / "LICENSE").write_text("license")
+    (tmp_path / "new.txt").write_text("deleted")
+    (tmp_path / "committed.txt").write_text("deleted")
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "commit", "--quiet", "--message=First", date="2015-06-01T12:00:00+00:00")
+    _git(tmp_path, "rm", "--quiet", "new.txt", "committed.txt")
+    _git(tmp_path, "commit", "--quiet", "--message=Delete", date="2018-06-01T12:00:00+00:00")
+    (tmp_path / "committed.txt").write_text("recreated")
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "commit", "--quiet", "--message=Recreate", date="2020-06-01T12:00:00+00:00")
+    (tmp_path / "new.txt").write_text("recreated")
+
+    monkeypatch.chdir(tmp_path)
+    git_cmd = shutil.which("git")
+    assert git_cmd is not None
+    files = ["LICENSE", "new.txt", "committed.txt"]
+
+    states, first_years = _get_git_states_history(git_cmd, files, "LICENSE")
+
+    assert states == _get_git_states_batch(git_cmd, files, "LICENSE")
+    assert first_years == {"LICENSE": "2015", "committed.txt": "2020"}
+
+
+@pytest.mark.parametrize(
+    ("content", "expected", "expected_updated"),
+    [
+        ("# Test (c) 2020-2023\ntoto", "# Test (c) 2020-2023\ntoto", True),
+        ("# Test (c) 2021-2023\ntoto", "# Test (c) 2020-2024\ntoto", False),
+        ("# Test (c) 2023\ntoto", "# Test (c) 2020-2024\ntoto", False),
+        ("# Test (c) 2019\ntoto", "# Test (c) 2020-2024\ntoto", False),
+    ],
+)
+def test_update_file_first_year(content: str, expected: str, expected_updated: bool) -> None:
+    """With the first year, the from year should be fixed."""
+    updated, content = update_file(
+        content,
+        "2023",
+        re.compile(r" Test \(c\) (?P<year>[0-9]{4})"),
+        re.compile(r" Test \(c\) (?P<from>[0-9]{4})-(?P<to>[0-9]{4})"),
+        " Test (c) {year}",
+        " Test (c) {from}-{to}",
+        current_year="2024",
+        first_year="2020",
+    )
+
+    assert updated == expected_updated
+    assert content == expected
+
+
+@pytest.mark.parametrize(
+    ("header_lines", "header_bytes", "expected"),
+    [
+        (2, None, b"# Test (c) 2022-2024\r\n"),
+        (None, 30, b"# Test (c) 2022-2024\r\n"),
+        (None, 10, b"# Test (c) 2022\r\n"),
+        (1, 30, b"# Test (c) 2022\r\n"),
+    ],
+)
+def test_update_file_header(
+    tmp_path: Path, header_lines: int | None, header_bytes: int | None, expected: bytes
+) -> None:
+    """Only the header should be updated, the rest of the file is kept as is."""
+    file_path = tmp_path / "file.txt"
+    tail = b"\xff\xfe not UTF-8\r\n# Test (c) 2020\r\n"
+    file_path.write_bytes(b"first line\r\n# Test (c) 2022\r\n" + tail)
+
+    update = functools.partial(
+        update_file,
+        last_year="2023",
+        one_date_re=re.compile(r" Test \(c\) (?P<year>[0-9]{4})"),
+        two_date_re=re.compile(r" Test \(c\) (?P<from>[0-9]{4})-(?P<to>[0-9]{4})"),
+        one_date_format=" Test (c) {year}",
+        two_date_format=" Test (c) {from}-{to}",
+        current_year="2024",
+    )
+    file_success, changed = _update_file_header(str(file_path), update, header_lines, header_bytes)
+
+    assert changed == (expected != b"# Test (c) 2022\r\n")
+    assert file_success == (not changed)
+    assert file_path.read_bytes() == b"first line\r\n" + expected + tail
+
+
+def test_update_file_header_lines_and_bytes(tmp_path: Path) -> None:
+    """With both limits, a character cut by the bytes limit should not skip the file."""
+    file_path = tmp_path / "file.txt"
+    # The bytes limit cuts the 'é', the lines limit is after the end of the file
+    file_path.write_bytes("# Test (c) 2022\nwith été\n".encode())
+
+    update = functools.partial(
+        update_file,
+        last_year="2023",
+        one_date_re=re.compile(r" Test \(c\) (?P<year>[0-9]{4})"),
+        two_date_re=re.compile(r" Test \(c\) (?P<from>[0-9]{4})-(?P<to>[0-9]{4})"),
+        one_date_format=" Test (c) {year}",
+        two_date_format=" Test (c) {from}-{to}",
+        current_year="2024",
+    )
+    file_success, changed = _update_file_header(str(file_path), update, 5, 22)
+
+    assert (file_success, changed) == (False, True)
+    assert file_path.read_text(encoding="utf-8") == "# Test (c) 2022-2024\nwith été\n"
+
+
+@pytest.mark.parametrize(
+    ("content", "expected", "expected_updated"),
+    [
+        (b"toto", b"toto", True),
+        (b"# Test (c) 2023\ntoto", b"# Test (c) 2023\ntoto", True),
+        (b"# Test (c) 2022\r\ntoto", b"# Test (c) 2022-2024\r\ntoto", False),
+        (b"# Test (c) 2022-2023\ntoto \xff", b"# Test (c) 2022-2023\ntoto \xff", True),
+        (b"# Test (c) 2024-2024\ntoto", b"# Test (c) 2024\ntoto", False),
+        (b"# Test (c) 2022\n\0toto", b"# Test (c) 2022\n\0toto", True),
+        (b"# Test (c) 2022\ntoto \xff", b"# Test (c) 2022\ntoto \xff", True),
+        (b"", b"", True),
+    ],
+)
+def test_process_file(tmp_path: Path, content: bytes, expected: bytes, expected_updated: bool) -> None:
+    """The content is only decoded when it should be updated, binary and invalid files are skipped."""
+    file_path = tmp_path / "file.txt"
+    file_path.write_bytes(content)
+    one_date_re = re.compile(r" Test \(c\) (?P<year>[0-9]{4})")
+    two_date_re = re.compile(r" Test \(c\) (?P<from>[0-9]{4})-(?P<to>[0-9]{4})")
+
+    updated, _, _ = _process_file(
+        str(file_path),
+        "2023",
+        functools.partial(
+            update_file,
+            one_date_re=one_date_re,
+            two_date_re=two_date_re,
+            one_date_format=" Test (c) {year}",
+            two_date_format=" Test (c) {from}-{to}",
+            current_year="2024",
+        ),
+        _get_bytes_patterns(one_date_re, two_date_re),
+        header_lines=None,
+        header_bytes=None,
+        max_size=None,
+        verbose=False,
+    )
+
+    assert updated == expected_updated
+    assert file_path.read_bytes() == expected
+
+
+def test_list_files(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    _git(tmp_path, "init", "--quiet")
+    (tmp_path / "old.txt").write_text("old")
+    (tmp_path / "deleted.txt").write_text("deleted")
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "commit", "--quiet", "--message=First")
+    _git(tmp_path, "tag", "first")
+    (tmp_path / "dir").mkdir()
+    (tmp_path / "dir" / "new.txt").write_text("new")
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "rm", "--quiet", "deleted.txt")
+    _git(tmp_path, "commit", "--quiet", "--message=Second")
+    (tmp_path / "old.txt").write_text("old 2")
+    (tmp_path / "untracked.txt").write_text("untracked")
+
+    monkeypatch.chdir(tmp_path)
+    git_cmd = shutil.which("git")
+    assert git_cmd is not None
+
+    assert _list_files(git_cmd) == ["dir/new.txt", "old.txt"]
+    assert _list_files(git_cmd, "first") == ["dir/new.txt", "old.txt"]
+    assert _list_files(git_cmd, "HEAD") == ["old.txt"]
+    monkeypatch.chdir(tmp_path / "dir")
+    assert _list_files(git_cmd, "first") == ["new.txt"]
+
+
+@pytest.mark.parametrize("jobs", ["0", "-1", "a"])
+def test_invalid_jobs(monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str], jobs: str) -> None:
+    """The number of jobs should be a positive integer."""
+    monkeypatch.setattr(sys, "argv", ["copyright-check", f"--jobs={jobs}", "file.txt"])
+
+    with pytest.raises(SystemExit) as excinfo:
+        main()
+
+    assert excinfo.value.code == 2
+    assert "--jobs: invalid positive integer value" in capsys.readouterr().err
+
+
+def test_process_file_unicode_pattern(tmp_path: Path) -> None:
+    """The patterns that can match non-ASCII characters are searched in the decoded content."""
+    file_path = tmp_path / "file.txt"
+    # With a no-break space, not matched by \s in a bytes pattern
+    file_path.write_text("#\u00a0Test (c) 2022\ntoto", encoding="utf-8")
+    one_date_re = re.compile(r"\sTest \(c\) (?P<year>[0-9]{4})")
+    two_date_re = re.compile(r"\sTest \(c\) (?P<from>[0-9]{4})-(?P<to>[0-9]{4})")
+
+    assert _get_bytes_patterns(one_date_re, two_date_re) is None
+    assert _get_bytes_patterns(re.compile(r" Test \(c\) ([0-9]{4})"), re.compile(r"(?i) test")) is None
+    assert _get_bytes_patterns(re.compile(r" Test \(c\) ([0-9]{4})"), re.compile(r"[^-]")) is None
+
+    updated, _, _ = _process_file(
+        str(file_path),
+        "2023",
+        functools.partial(
+            update_file,
+            one_date_re=one_date_re,
+            two_date_re=two_date_re,
+            one_date_format=" Test (c) {year}",
+            two_date_format=" Test (c) {from}-{to}",
+            current_year="2024",
+        ),
+        _get_bytes_patterns(one_date_re, two_date_re),
+        header_lines=None,
+        header_bytes=None,
+        max_size=None,
+        verbose=False,
+    )
+
+    assert not updated
+    assert file_path.read_text(encoding="utf-8") == "# Test (c) 2022-2024\ntoto"
+
+
+def test_update_file_current_year(monkeypatch: pytest.MonkeyPatch) -> None:
+    """The current year is got at each run, a daemon can run over the new year."""
+    monkeypatch.setattr(copyright_, "get_current_year", lambda: "2030")
+
+    assert update_file(
+        "# Test (c) 2022\ntoto",
+        "2030",
+        re.compile(r" Test \(c\) (?P<year>[0-9]{4})"),
+        re.compile(r" Test \(c\) (?P<from>[0-9]{4})-(?P<to>[0-9]{4})"),
+        " Test (c) {year}",
+        " Test (c) {from}-{to}",
+    ) == (False, "# Test (c) 2022-2030\ntoto")
+
+
+def test_default_patterns_bytes(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """With the default patterns, the up to date files are checked as bytes, without being decoded."""
+    one_date_re = re.compile(copyright_.DEFAULT_ONE_DATE_RE)
+    two_date_re = re.compile(copyright_.DEFAULT_TWO_DATE_RE)
+    bytes_patterns = _get_bytes_patterns(one_date_re, two_date_re)
+    assert bytes_patterns is not None
+
+    file_path = tmp_path / "file.txt"
+    file_path.write_text("# Copyright (c) 2020-2023, Stéphane\ntoto", encoding="utf-8")
+
+    def no_update(content: str) -> tuple[bool, str]:
+        raise AssertionError("The file should not be decoded")
+
+    assert copyright_._update_whole_file(str(file_path), "2023", no_update, bytes_patterns) == (True, False)
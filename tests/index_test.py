@@ -0,0 +1,75 @@
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from sbrunner_hooks.index import RepositoryIndex, classify
+
+
+@pytest.mark.parametrize(
+    ("path", "expected"),
+    [
+        (".github/workflows/main.yaml", "workflow"),
+        (".github/workflows/main.yml", "workflow"),
+        (".github/workflows/sub/main.yaml", None),
+        (".github/copyright.yaml", None),
+        (".prospector.yaml", "prospector"),
+        ("dir/prospector.yml", "prospector"),
+        ("dir/.prospector-tests.yaml", "prospector"),
+        ("prospector-tests.yaml", "prospector"),
+        ("prospector_profile_test/base.yaml", "prospector"),
+        ("prospector_profile_test/pyproject.toml", "prospector"),
+        ("dir/prospector_profile_test/base.yaml", None),
+        ("prospector.toml", None),
+        ("pyproject.toml", "pyproject"),
+        ("dir/pyproject.toml", "pyproject"),
+        ("dir/pyproject.toml.bak", None),
+        (".pre-commit-config.yaml", "pre-commit"),
+        ("dir/.pre-commit-config.yml", "pre-commit"),
+        (".pre-commit-hooks.yaml", None),
+        ("README.md", None),
+    ],
+)
+def test_classify(path: str, expected: str) -> None:
+    assert classify(path) == expected
+
+
+def test_repository_index(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    def git(*args: str) -> None:
+        subprocess.run(["git", *args], cwd=tmp_path, check=True, stdout=subprocess.DEVNULL)
+
+    git("init", "--quiet")
+    git("config", "user.email", "test@example.com")
+    git("config", "user.name", "Test")
+    (tmp_path / "dir").mkdir()
+    (tmp_path / "dir" / "pyproject.toml").write_text("[project]\n")
+    (tmp_path / "dir" / "other.txt").write_text("other")
+    (tmp_path / "deleted.txt").write_text("deleted")
+    (tmp_path / "link").symlink_to("deleted.txt")
+    git("add", ".")
+    git("commit", "--quiet", "--message=First")
+    (tmp_path / "deleted.txt").unlink()
+    (tmp_path / "dir" / "other.txt").write_text("modified")
+    (tmp_path / "untracked.txt").write_text("untracked")
+
+    git_cmd = shutil.which("git")
+    assert git_cmd is not None
+    monkeypatch.chdir(tmp_path)
+    index = RepositoryIndex(git_cmd)
+    assert index.files() == ["dir/other.txt", "dir/pyproject.toml"]
+    assert index.files(["pyproject"]) == ["dir/pyproject.toml"]
+    assert index.dirty_files == {"deleted.txt", "dir/other.txt", "untracked.txt"}
+
+    monkeypatch.chdir(tmp_path / "dir")
+    index = RepositoryIndex(git_cmd)
+    assert index.files() == ["other.txt", "pyproject.toml"]
+    info = index.get_info("pyproject.toml")
+    assert info is not None
+    assert info.path == "dir/pyproject.toml"
+    assert info.kind == "pyproject"
+    assert index.get_info("../untracked.txt") is None
+    assert index.is_dirty("other.txt")
+    assert not index.is_dirty("pyproject.toml")
+    assert index.is_dirty("../untracked.txt")
+    assert index.get_size("pyproject.toml") == len("[project]\n")
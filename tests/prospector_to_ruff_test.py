@@ -0,0 +1,71 @@
+from pathlib import Path
+
+import prospector.profiles.profile
+import pytest
+
+from sbrunner_hooks.cache import JsonCache, hash_inputs
+from sbrunner_hooks.prospector_to_ruff import _ProfileLoader
+
+
+def test_profile_loader(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    package_path = tmp_path / "packages" / "prospector_profile_shared"
+    package_path.mkdir(parents=True)
+    (package_path / "__init__.py").touch()
+    (package_path / "base.yaml").write_text(
+        "strictness: high\npep8: full\nruff:\n  disable:\n    - E501\n", encoding="utf-8"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path / "packages"))
+    for name, line_length in (("a", 100), ("b", 110)):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / ".prospector.yaml").write_text(
+            f"inherits:\n  - shared:base\nruff:\n  options:\n    line-length: {line_length}\n",
+            encoding="utf-8",
+        )
+
+    loaded: list[str] = []
+    original_load_content = prospector.profiles.profile._load_content
+
+    def load_content(name_or_path: str, profile_path: list[Path]) -> dict:
+        loaded.append(str(name_or_path))
+        return original_load_content(name_or_path, profile_path)
+
+    monkeypatch.setattr(prospector.profiles.profile, "_load_content", load_content)
+
+    cache = JsonCache(tmp_path / "cache.json", hash_inputs())
+    loader = _ProfileLoader(cache)
+    for name in ("a", "b"):
+        profile_path = [tmp_path / name, prospector.profiles.profile.BUILTIN_PROFILE_PATH]
+        expected = prospector.profiles.profile.ProspectorProfile.load(".prospector.yaml", profile_path)
+        loaded.clear()
+        assert loader.load(".prospector.yaml", profile_path).as_dict() == expected.as_dict()
+        if name == "b":
+            # The shared parent profiles are already loaded
+            assert loaded == [".prospector.yaml"]
+    assert prospector.profiles.profile._load_content is load_content
+    cache.save()
+
+    # From the disk cache
+    loader = _ProfileLoader(JsonCache(tmp_path / "cache.json", hash_inputs()))
+    loaded.clear()
+    assert loader.load(".prospector.yaml", profile_path).as_dict() == expected.as_dict()
+    assert loaded == []
+
+
+def test_profile_loader_candidates(tmp_path: Path) -> None:
+    """With several candidate files, the content should be the one of the file used by prospector."""
+    for name, line_length in (("first", 1), ("second", 2)):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "profile.yaml").write_text(
+            f"ruff:\n  options:\n    line-length: {line_length}\n", encoding="utf-8"
+        )
+    builtin_path = prospector.profiles.profile.BUILTIN_PROFILE_PATH
+    profile_path = [tmp_path / "first", tmp_path / "second", builtin_path]
+    expected = prospector.profiles.profile.ProspectorProfile.load("profile", profile_path)
+
+    loader = _ProfileLoader()
+    assert loader.load("profile", profile_path).as_dict() == expected.as_dict()
+    # Another search path with one of the candidates
+    profile_path = [tmp_path / "first", builtin_path]
+    expected = prospector.profiles.profile.ProspectorProfile.load("profile", profile_path)
+    assert loader.load("profile", profile_path).as_dict() == expected.as_dict()
+    assert expected.ruff["options"]["line-length"] == 1
@@ -0,0 +1,175 @@
+import re
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+import yaml
+
+from sbrunner_hooks import run_hooks
+
+
+def test_run_hooks(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / ".github" / "workflows").mkdir(parents=True)
+    (tmp_path / ".github" / "workflows" / "main.yaml").write_text(
+        "jobs:\n  build:\n    runs-on: ubuntu-latest\n", encoding="utf-8"
+    )
+    (tmp_path / "README.md").write_text("Readme\n", encoding="utf-8")
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "sbrunner-hooks",
+            "run",
+            "workflows-require-timeout",
+            "prospector-to-ruff",
+            "--",
+            ".github/workflows/main.yaml",
+            "README.md",
+        ],
+    )
+
+    with pytest.raises(SystemExit) as exit_:
+        run_hooks.main()
+    assert exit_.value.code == 1
+    assert sys.argv[0] == "sbrunner-hooks"
+    output = capsys.readouterr().out.splitlines()
+    assert output == [
+        "The workflow '.github/workflows/main.yaml', job 'build' has no timeout",
+        "workflows-require-timeout: Failed (exit code 1)",
+        "prospector-to-ruff: Skipped (no files to check)",
+    ]
+
+
+def test_daemon(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]) -> None:
+    from sbrunner_hooks import daemon
+
+    monkeypatch.chdir(tmp_path)
+    socket_path = tmp_path / "daemon" / "daemon.sock"
+    monkeypatch.setattr(daemon, "get_socket_path", lambda: socket_path)
+    workflow = tmp_path / ".github" / "workflows" / "main.yaml"
+    workflow.parent.mkdir(parents=True)
+    workflow.write_text("jobs:\n  build:\n    runs-on: ubuntu-latest\n", encoding="utf-8")
+    argv = [
+        "sbrunner-hooks",
+        "run",
+        "--daemon",
+        "workflows-require-timeout",
+        "--",
+        ".github/workflows/main.yaml",
+    ]
+    monkeypatch.setattr(sys, "argv", argv)
+    runs: list[list[str]] = []
+    run_hook = run_hooks._run_hook
+
+    def record_run_hook(name: str, files: list[str]) -> int:
+        runs.append(files)
+        return run_hook(name, files)
+
+    monkeypatch.setattr(run_hooks, "_run_hook", record_run_hook)
+    monkeypatch.setattr(run_hooks, "_MEMO", {})
+
+    # Without daemon, the hooks are run in process
+    with pytest.raises(SystemExit) as exit_:
+        run_hooks.main()
+    assert exit_.value.code == 1
+    assert capsys.readouterr().out.splitlines() == [
+        "The workflow '.github/workflows/main.yaml', job 'build' has no timeout",
+        "workflows-require-timeout: Failed (exit code 1)",
+    ]
+
+    server = threading.Thread(target=daemon.serve, args=(run_hooks._handle_daemon_request, 10))
+    server.start()
+    try:
+        while daemon.request({"command": "ping"}) is None:
+            time.sleep(0.01)
+
+        with pytest.raises(SystemExit) as exit_:
+            run_hooks.main()
+        assert exit_.value.code == 1
+        assert capsys.readouterr().out.splitlines() == [
+            "The workflow '.github/workflows/main.yaml', job 'build' has no timeout",
+            "workflows-require-timeout: Failed (exit code 1)",
+        ]
+
+        workflow.write_text(
+            "jobs:\n  build:\n    runs-on: ubuntu-latest\n    timeout-minutes: 5\n", encoding="utf-8"
+        )
+        for _ in range(2):
+            with pytest.raises(SystemExit) as exit_:
+                run_hooks.main()
+            assert exit_.value.code == 0
+            assert capsys.readouterr().out.splitlines() == ["workflows-require-timeout: Passed"]
+        # The unchanged file that passed is not checked again
+        assert runs == [[".github/workflows/main.yaml"]] * 3
+    finally:
+        daemon.request({"command": "stop"})
+        server.join()
+    assert not socket_path.exists()
+
+
+def test_hook_arguments(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "README.md").write_text("Readme\n", encoding="utf-8")
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["sbrunner-hooks", "run", "copyright", "copyright:--required --verbose", "--", "README.md"],
+    )
+
+    with pytest.raises(SystemExit) as exit_:
+        run_hooks.main()
+    assert exit_.value.code == 1
+    output = capsys.readouterr().out.splitlines()
+    assert "No copyright found on 'README.md'." in output
+    assert output[-2:] == ["copyright: Passed", "copyright:--required --verbose: Failed (exit code 1)"]
+
+    assert run_hooks._parse_hook("prospector-to-ruff:--test=utils:tests") == (
+        "prospector-to-ruff",
+        ["--test=utils:tests"],
+    )
+    assert run_hooks._parse_hook("canonicalize") == ("canonicalize", [])
+
+
+def test_is_content_only() -> None:
+    assert run_hooks._is_content_only("workflows-require-timeout")
+    assert run_hooks._is_content_only("canonicalize:--jobs=2")
+    # Depends on the files tracked by Git
+    assert not run_hooks._is_content_only("canonicalize:--optimize-exclude")
+    assert not run_hooks._is_content_only("workflows-require-timeout:--all")
+    assert not run_hooks._is_content_only("copyright")
+
+
+def test_daemon_timeout(tmp_path: Path) -> None:
+    """The client should not wait forever for a daemon that doesn't respond."""
+    from sbrunner_hooks import daemon
+
+    socket_path = tmp_path / "daemon.sock"
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+        server.bind(str(socket_path))
+        server.listen()
+
+        assert daemon.request({"command": "ping"}, socket_path, timeout=0.1) is None
+
+
+def test_hooks_definition() -> None:
+    """The hooks should be run like defined in the `.pre-commit-hooks.yaml` file."""
+    with (Path(__file__).parent.parent / ".pre-commit-hooks.yaml").open(encoding="utf-8") as hooks_file:
+        hooks = {hook["id"]: hook for hook in yaml.safe_load(hooks_file)}
+
+    def normalize(pattern: str) -> str:
+        # The spaces are not significant in the verbose patterns
+        return re.sub(r"\s", "", pattern) if pattern.startswith("(?x)") else pattern
+
+    for name, hook in run_hooks._HOOKS.items():
+        assert hook.args == hooks[name].get("args", []), name
+        assert (None if hook.files is None else normalize(hook.files.pattern)) == (
+            None if "files" not in hooks[name] else normalize(hooks[name]["files"])
+        ), name
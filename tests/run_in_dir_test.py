@@ -0,0 +1,134 @@
+import argparse
+import os
+import signal
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from sbrunner_hooks import run_in_dir
+from sbrunner_hooks.run_in_dir import _chunk_arguments
+
+
+def test_chunk_arguments() -> None:
+    # Each argument takes its length plus 9 bytes (null terminator and pointer)
+    assert _chunk_arguments(["cmd"], ["a", "b", "c"], 100) == [["a", "b", "c"]]
+    assert _chunk_arguments(["cmd"], ["a", "b", "c"], 32) == [["a", "b"], ["c"]]
+    assert _chunk_arguments(["cmd"], ["a", "b", "c"], 22) == [["a"], ["b"], ["c"]]
+    # An argument is always passed, even if too long
+    assert _chunk_arguments(["cmd"], ["a" * 100, "b"], 22) == [["a" * 100], ["b"]]
+    assert _chunk_arguments(["cmd"], [], 100) == []
+
+
+def test_stamp_per_command(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """The commands running on the same directory should have their own stamps."""
+    (tmp_path / "record.py").write_text(
+        "import sys\nwith open('calls.txt', 'a') as f:\n    f.write(sys.argv[1] + '\\n')\n"
+    )
+    (tmp_path / "pyproject.toml").write_text("[project]\n")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(run_in_dir, "get_cache_dir", lambda: tmp_path / "cache")
+
+    def run(name: str) -> None:
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            [
+                "run-in-dir",
+                "--stamp",
+                "--cmd",
+                sys.executable,
+                "record.py",
+                name,
+                "--files",
+                "pyproject.toml",
+            ],
+        )
+        run_in_dir.main()
+
+    run("lock")
+    run("check")
+    run("lock")
+    run("check")
+    assert (tmp_path / "calls.txt").read_text().split() == ["lock", "check"]
+
+    (tmp_path / "pyproject.toml").write_text("[project]\nname = 'test'\n")
+    run("check")
+    run("lock")
+    run("check")
+    assert (tmp_path / "calls.txt").read_text().split() == ["lock", "check", "check", "lock"]
+
+
+@pytest.mark.parametrize("profile", [False, True])
+def test_run_process(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, profile: bool) -> None:
+    """The child is reaped with wait4 only when profiling, and the runner forgets it before."""
+    wait4 = os.wait4 if hasattr(os, "wait4") else None
+    processes: list[set[Any]] = []
+
+    def checked_wait4(pid: int, options: int) -> tuple[int, int, Any]:
+        assert profile
+        processes.append(set(runner._processes))
+        assert wait4 is not None
+        return wait4(pid, options)
+
+    monkeypatch.setattr(os, "wait4", checked_wait4, raising=False)
+    args = argparse.Namespace(cmd=[sys.executable, "-c", "print('out'); exit(3)"], arg=[], profile=profile)
+    runner = run_in_dir._DirectoryRunner(args, capture=True, stamps=None)
+    output: list[bytes] = []
+
+    assert runner._run(runner.command, tmp_path, output) == 3
+
+    assert output == [b"out\n"]
+    assert processes == ([set()] if profile else [])
+    if profile:
+        assert runner.profile is not None
+        assert runner.profile[0]["returncode"] == 3
+        assert runner.profile[0]["user_time"] is not None
+
+
+def test_run_interrupted(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """On Ctrl-C, the running commands of the other process groups should be terminated."""
+    args = argparse.Namespace(
+        cmd=[sys.executable, "-c", "import time; time.sleep(60)"],
+        arg=[],
+        profile=None,
+        check=None,
+        pass_filename=False,
+        batch=False,
+        jobs=2,
+        fail_fast=False,
+        lock_file=None,
+    )
+    runner = run_in_dir._DirectoryRunner(args, capture=True, stamps=None)
+    processes: list[Any] = []
+
+    def as_completed(futures: list[Any]) -> Any:
+        del futures
+        while len(runner._processes) < 2:
+            time.sleep(0.01)
+        processes.extend(runner._processes)
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(run_in_dir.concurrent.futures, "as_completed", as_completed)
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    start = time.perf_counter()
+
+    with pytest.raises(KeyboardInterrupt):
+        run_in_dir._run(args, runner, {tmp_path / "a": ["file"], tmp_path / "b": ["file"]})
+
+    assert time.perf_counter() - start < 30
+    assert [proc.returncode for proc in processes] == [-signal.SIGTERM, -signal.SIGTERM]
+
+
+def test_invalid_jobs(monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]) -> None:
+    """The number of jobs should be a positive integer."""
+    monkeypatch.setattr(sys, "argv", ["run-in-dir", "--jobs=0", "--cmd", "true", "--files", "file"])
+
+    with pytest.raises(SystemExit) as excinfo:
+        run_in_dir.main()
+
+    assert excinfo.value.code == 2
+    assert "--jobs: invalid positive integer value" in capsys.readouterr().err
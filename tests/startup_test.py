@@ -0,0 +1,41 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+# The heavy dependencies should be imported lazily, only by the functions that use them,
+# to keep the startup of each hook entry point fast
+_HEAVY_MODULES = ["multi_repo_automation", "prospector", "ruamel", "tomlkit"]
+_LAZY_MODULES = {
+    "canonicalize": [*_HEAVY_MODULES, "yaml"],
+    "copyright": _HEAVY_MODULES,
+    "prospector_to_ruff": [*_HEAVY_MODULES, "yaml"],
+    "run_hooks": [*_HEAVY_MODULES, "yaml", "sbrunner_hooks.copyright", "sbrunner_hooks.canonicalize"],
+    "run_in_dir": [*_HEAVY_MODULES, "yaml"],
+    "workflow_timeout": _HEAVY_MODULES,
+}
+
+
+def _get_imported_modules(module: str) -> list[str]:
+    """Get the modules imported by the import of the module, in a new interpreter."""
+    proc = subprocess.run(
+        [sys.executable, "-c", f"import json, sys\nimport {module}\nprint(json.dumps(list(sys.modules)))"],
+        check=True,
+        capture_output=True,
+        encoding="utf-8",
+    )
+    return json.loads(proc.stdout)
+
+
+@pytest.mark.parametrize("hook", list(_LAZY_MODULES))
+def test_lazy_imports(hook: str) -> None:
+    lazy_modules = _LAZY_MODULES[hook]
+    module = f"sbrunner_hooks.{hook}"
+
+    imported = [
+        name
+        for name in _get_imported_modules(module)
+        if any(name == lazy_module or name.startswith(f"{lazy_module}.") for lazy_module in lazy_modules)
+    ]
+    assert imported == [], f"{module} should import them lazily"
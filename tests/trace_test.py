@@ -0,0 +1,77 @@
+import json
+import threading
+from pathlib import Path
+
+import pytest
+
+from sbrunner_hooks import trace
+
+
+def test_disabled(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(trace, "_EVENTS", None)
+    monkeypatch.setattr(trace, "_OUTPUT", None)
+    monkeypatch.delenv(trace.ENVIRONMENT_VARIABLE, raising=False)
+    trace.setup(None)
+
+    assert not trace.is_enabled()
+    # No allocation when the tracing is disabled
+    assert trace.span("first") is trace.span("second", file="file.txt")
+
+
+def test_trace(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(trace, "_EVENTS", None)
+    monkeypatch.setattr(trace, "_OUTPUT", None)
+    monkeypatch.setattr(trace, "_THREADS", {})
+    # Not saved at the end of the tests
+    monkeypatch.setattr(trace, "_SAVE_REGISTERED", True)
+    monkeypatch.setenv(trace.ENVIRONMENT_VARIABLE, str(tmp_path / "trace.json"))
+    trace.setup(None)
+    assert trace.is_enabled()
+
+    def work() -> None:
+        with trace.span("thread"):
+            pass
+
+    with trace.span("outer", file="file.txt"):
+        with trace.span("inner"):
+            pass
+        thread = threading.Thread(target=work, name="worker")
+        thread.start()
+        thread.join()
+    with pytest.raises(ValueError, match="error"), trace.span("failed"):
+        raise ValueError("error")
+    trace.save()
+
+    events = json.loads((tmp_path / "trace.json").read_text(encoding="utf-8"))["traceEvents"]
+    complete_events = {event["name"]: event for event in events if event["ph"] == "X"}
+    assert list(complete_events) == ["inner", "thread", "outer", "failed"]
+    assert complete_events["outer"]["args"] == {"file": "file.txt"}
+    assert complete_events["failed"]["args"] == {"error": "ValueError"}
+    outer, inner = complete_events["outer"], complete_events["inner"]
+    assert outer["ts"] <= inner["ts"]
+    assert inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+    assert complete_events["thread"]["tid"] != outer["tid"]
+    assert {event["args"]["name"] for event in events if event["name"] == "thread_name"} == {
+        threading.current_thread().name,
+        "worker",
+    }
+
+
+def test_flush(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """The daemon writes the events of each request, and doesn't keep them."""
+    monkeypatch.setattr(trace, "_EVENTS", None)
+    monkeypatch.setattr(trace, "_OUTPUT", None)
+    monkeypatch.setattr(trace, "_THREADS", {})
+    monkeypatch.setattr(trace, "_SAVE_REGISTERED", True)
+    monkeypatch.chdir(tmp_path)
+
+    for name in ("first", "second"):
+        trace.enable(Path(f"{name}.json"))
+        with trace.span(name):
+            pass
+        trace.flush()
+        assert not trace.is_enabled()
+
+    for name in ("first", "second"):
+        events = json.loads((tmp_path / f"{name}.json").read_text(encoding="utf-8"))["traceEvents"]
+        assert [event["name"] for event in events if event["ph"] == "X"] == [name]
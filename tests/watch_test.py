@@ -0,0 +1,109 @@
+from collections.abc import Callable
+from pathlib import Path
+from typing import Optional, Union
+
+import pytest
+
+from sbrunner_hooks import watch
+
+
+class _ScriptedWatcher:
+    """Give the changed files of the script, an action is run before giving its changed files."""
+
+    def __init__(self, script: list[Union[set[str], Callable[[], set[str]]]]) -> None:
+        self.script = script
+        self.timeouts: list[Optional[float]] = []
+
+    def read(self, timeout: Optional[float]) -> set[str]:
+        self.timeouts.append(timeout)
+        if not self.script:
+            return set()
+        changed = self.script.pop(0)
+        return changed() if callable(changed) else changed
+
+    def close(self) -> None:
+        pass
+
+
+def test_watch(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "dir").mkdir()
+    file_path = tmp_path / "dir" / "file.txt"
+    file_path.write_text("original", encoding="utf-8")
+    (tmp_path / "other.log").write_text("original", encoding="utf-8")
+
+    def modify() -> set[str]:
+        file_path.write_text("modified", encoding="utf-8")
+        return {"dir/file.txt"}
+
+    watcher = _ScriptedWatcher(
+        [
+            # A burst of events, processed once
+            {"dir/file.txt", "other.log"},
+            {"dir/file.txt"},
+            set(),
+            # The write of the process function
+            {"dir/file.txt"},
+            set(),
+            # Nothing
+            set(),
+            # A new modification
+            modify,
+            set(),
+        ],
+    )
+    calls = []
+
+    def process(files: list[str]) -> None:
+        calls.append(files)
+        Path(files[0]).write_text(f"processed {len(calls)}", encoding="utf-8")
+
+    watch.watch(
+        [".", "dir"],
+        lambda file_name: file_name.endswith(".txt"),
+        process,
+        debounce=0.1,
+        poll_interval=1,
+        should_stop=lambda: not watcher.script,
+        watcher=watcher,
+    )
+
+    assert calls == [["dir/file.txt"], ["dir/file.txt"]]
+    assert file_path.read_text(encoding="utf-8") == "processed 2"
+    # Wait the first event at most the poll interval, then the next ones at most the debounce delay
+    assert watcher.timeouts == [1, 0.1, 0.1, 1, 0.1, 1, 1, 0.1]
+
+
+def test_inotify_watcher(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "dir").mkdir()
+    try:
+        watcher = watch._InotifyWatcher([".", "dir"])
+    except (OSError, AttributeError) as error:
+        pytest.skip(f"inotify is not available ({error!s})")
+    try:
+        assert watcher.read(0) == set()
+        (tmp_path / "dir" / "file.txt").write_text("content", encoding="utf-8")
+        (tmp_path / "other.txt").write_text("content", encoding="utf-8")
+        changed: set[str] = set()
+        while len(changed) < 2:
+            # The events are already queued
+            more = watcher.read(10)
+            assert more
+            changed |= more
+        assert changed == {"dir/file.txt", "other.txt"}
+    finally:
+        watcher.close()
+
+
+def test_polling_watcher(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "dir").mkdir()
+    (tmp_path / "dir" / "file.txt").write_text("content", encoding="utf-8")
+    watcher = watch._PollingWatcher([".", "dir"], interval=0)
+
+    assert watcher.read(None) == set()
+    (tmp_path / "dir" / "file.txt").write_text("new content", encoding="utf-8")
+    (tmp_path / "other.txt").write_text("content", encoding="utf-8")
+    assert watcher.read(None) == {"dir/file.txt", "other.txt"}
+    assert watcher.read(None) == set()
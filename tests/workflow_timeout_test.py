@@ -0,0 +1,59 @@
+from pathlib import Path
+
+import pytest
+
+from sbrunner_hooks import workflow_timeout
+
+
+@pytest.mark.parametrize(
+    ("content", "expected"),
+    [
+        pytest.param(
+            """name: Test
+on: push
+jobs:
+  build:
+    runs-on: ubuntu-latest
+    timeout-minutes: 10
+    steps:
+      - run: |
+          echo jobs:
+  test:
+    runs-on: ubuntu-latest
+    strategy:
+      matrix:
+        timeout-minutes: [1, 2]
+  lint: {runs-on: ubuntu-latest, timeout-minutes: ~}
+""",
+            [("test", 10, 3), ("lint", 15, 3)],
+            id="simple",
+        ),
+        pytest.param(
+            """jobs:
+  build: &build
+    timeout-minutes: 10
+  test:
+    <<: *build
+  other: *build
+""",
+            None,
+            id="aliases",
+        ),
+    ],
+)
+def test_stream(tmp_path: Path, content: str, expected: list[tuple[str, int, int]]) -> None:
+    file_path = tmp_path / "workflow.yaml"
+    file_path.write_text(content, encoding="utf-8")
+
+    messages = workflow_timeout._get_missing_timeouts(file_path)
+    if expected is None:
+        # Fallback on the loaded workflow
+        assert workflow_timeout._get_missing_timeouts_streamed(file_path) == messages
+    else:
+        assert workflow_timeout._get_missing_timeouts_streamed(file_path) == [
+            f"{file_path}:{line}:{column}: The workflow '{file_path}', job '{name}' has no timeout"
+            for name, line, column in expected
+        ]
+        assert messages == [
+            f"The workflow '{file_path}', job '{name}' has no timeout" for name, _, _ in expected
+        ]
@@ -0,0 +1,31 @@
+from pathlib import Path
+
+import pytest
+import yaml
+
+from sbrunner_hooks import yaml_loader
+
+_ROOT = Path(__file__).parent.parent
+_YAML_FILES = sorted(
+    [
+        _ROOT / "tests" / "Chart.yaml",
+        _ROOT / ".pre-commit-config.yaml",
+        _ROOT / ".pre-commit-hooks.yaml",
+        _ROOT / ".prospector.yaml",
+        *(_ROOT / ".github").glob("*.yaml"),
+        *(_ROOT / ".github" / "workflows").glob("*.yaml"),
+    ],
+)
+
+
+@pytest.mark.parametrize("file_path", _YAML_FILES, ids=lambda file_path: str(file_path.relative_to(_ROOT)))
+def test_load_equivalence(file_path: Path) -> None:
+    if not hasattr(yaml, "CSafeLoader"):
+        pytest.skip("PyYAML is built without libyaml")
+    content = file_path.read_text(encoding="utf-8")
+    assert yaml_loader.load(content, yaml.CSafeLoader) == yaml.load(content, Loader=yaml.SafeLoader)  # noqa: S506
+
+
+def test_get_backend() -> None:
+    expected = "libyaml" if hasattr(yaml, "CSafeLoader") else "pure Python"
+    assert yaml_loader.get_backend() == expected